@@ -1,17 +1,36 @@
+import asyncio
 import base64
+import difflib
+import importlib.util
 import logging
+import mmap
+import re
+import sys
 import threading
 import time
 import traceback
+from collections import deque
+from enum import IntEnum
+from functools import lru_cache
+from io import BytesIO, StringIO
+from types import MappingProxyType
 from typing import Dict, List, Optional, Union, Any
 
-# OpenAI SDK import
-from openai import OpenAI
-import httpx
+# The OpenAI SDK, httpx and PIL are imported where they are first used so that importing
+# this module at startup stays cheap; after the first use they come from sys.modules.
+
+# SIMD-accelerated base64 encoder (falls back to the stdlib encoder if missing)
+try:
+    from pybase64 import b64encode_as_string
+except ImportError:
+    def b64encode_as_string(data):
+        return base64.b64encode(data).decode('utf-8')
+
+# Optional local OCR for content detection (also needs the Tesseract binary installed)
+OCR_AVAILABLE = importlib.util.find_spec("pytesseract") is not None
 
 # Other imports
-from PIL import Image
-from PySide6.QtCore import QObject, Signal
+from PySide6.QtCore import QObject, Signal, Slot
 import os
 
 # Local configuration import
@@ -20,20 +39,371 @@ import config
 # Import helper function from overlay
 from overlay import get_short_model_name
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Logging is configured by the application (see main.py)
 logger = logging.getLogger(__name__)
 
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+# Optional OpenRouter headers for tracking/ranking, shared read-only by every request.
+# Authorization is added by the OpenAI SDK from the client's api_key.
+OPENROUTER_HEADERS = MappingProxyType({
+    "HTTP-Referer": config.OPENROUTER_REFERRER_URL,
+    "X-Title": config.OPENROUTER_SITE_TITLE,
+})
+
+# Streaming output is pushed to the UI at most every interval, or after this many chunks
+STREAM_UPDATE_INTERVAL = config.STREAM_UPDATE_INTERVAL_MS / 1000
+STREAM_UPDATE_MAX_CHUNKS = config.STREAM_UPDATE_MAX_CHUNKS
+
+VALID_CONTENT_TYPES = frozenset(["coding", "multiple_choice", "debugging", "system_design", "general"])
+
+# Synonyms the detection model sometimes answers with
+DETECTION_TYPE_MAPPING = {
+    "mcq": "multiple_choice", "quiz": "multiple_choice", "question": "multiple_choice",
+    "questions": "multiple_choice", "test": "multiple_choice",
+    "error": "debugging", "bug": "debugging", "issue": "debugging", "exception": "debugging",
+    "program": "coding", "algorithm": "coding", "leetcode": "coding", "hackerrank": "coding",
+    "design": "system_design", "architecture": "system_design", "diagram": "system_design"
+}
+DETECTION_WORD_PATTERN = re.compile(r"[a-z_]+")
+DETECTION_MATCH_CANDIDATES = sorted(VALID_CONTENT_TYPES) + list(DETECTION_TYPE_MAPPING)
+
+# Keyword rules applied to OCR text for local content detection, checked in order
+LOCAL_DETECTION_RULES = [
+    (re.compile(r"Traceback \(most recent call last\)|\b\w*(?:Error|Exception):|\bSegmentation fault\b"), "debugging"),
+    (re.compile(r"^\s*\(?A[.)]\s+\S.*?^\s*\(?B[.)]\s+\S", re.MULTILINE | re.DOTALL), "multiple_choice"),
+    (re.compile(r"\b(?:design an?|system design|scalab\w+|load balancer|high availability)\b", re.IGNORECASE), "system_design"),
+    (re.compile(r"\b(?:def|class|function|public static|leetcode|hackerrank|Constraints:|Example \d+:)\s", re.IGNORECASE), "coding"),
+]
+
+# Detection results are cached by screenshot hash; a new screenshot reuses the type of
+# a cached one whose hash differs in at most DETECTION_CACHE_MAX_DISTANCE bits
+DETECTION_HASH_SIZE = 16 # 16x16 gradient grid -> 256-bit hash
+DETECTION_CACHE_SIZE = 64
+DETECTION_CACHE_MAX_DISTANCE = 10
+
+# Matches answer lines like "2. yes" in the secondary detection response
+SECONDARY_YES_PATTERN = re.compile(r"^\s*([1-4])\s*[.):]?.*\byes\s*$", re.MULTILINE)
+
+class FollowupType(IntEnum):
+    """Follow-up question categories; values index FOLLOWUP_INSTRUCTIONS"""
+    ERROR_FIX = 0
+    EXPLANATION = 1
+    OPTIMIZATION = 2
+    ALTERNATIVE = 3
+    GENERAL = 4
+
+# Follow-up categories, checked in order. Each term list is compiled into a single
+# alternation so a question is scanned once per category.
+FOLLOWUP_PATTERNS = [
+    (followup_type, re.compile("|".join(re.escape(term) for term in terms)))
+    for followup_type, terms in [
+        (FollowupType.ERROR_FIX, ['error', 'bug', 'fix', 'wrong', 'incorrect', 'not working']),
+        (FollowupType.EXPLANATION, ['explain', 'clarify', 'help understand', 'how does']),
+        (FollowupType.OPTIMIZATION, ['optimize', 'faster', 'better', 'improve', 'efficient', 'performance']),
+        (FollowupType.ALTERNATIVE, ['alternative', 'other way', 'different approach', 'another solution']),
+    ]
+]
+
+# --- Analysis prompts ---
+ANALYSIS_BASE_INTRO = "You are an expert coding assistant. "
+
+# Different prompt types
+ANALYSIS_PROMPTS = {
+    # Standard coding problem prompt (e.g., LeetCode, HackerRank)
+    "coding": """Examine the screenshots of a programming problem and solve it.
+
+Instructions:
+1. Analyze the problem shown in the screenshots in detail
+2. Provide a step-by-step approach to solving the problem
+3. Include time and space complexity analysis
+4. Implement an efficient solution in the language shown in the problem 
+5. Use the EXACT function signature/template as provided in the problem
+6. Do not add extra type hints or modify the signature
+7. Add detailed comments explaining your solution
+8. Provide a walkthrough of your solution with at least one example
+9. Discuss any optimization techniques or potential edge cases
+
+Your solution should be complete and ready to submit.""",
+
+    # Debugging prompt - when screenshots likely contain error messages
+    "debugging": """Examine the error/issue in the screenshots and provide a solution.
+
+Instructions:
+1. Identify the specific error or issue shown in the screenshots
+2. Explain the root cause of the problem in detail
+3. Provide a complete solution or fix for the issue
+4. Include corrected code that resolves the problem
+5. Explain your changes and why they fix the issue
+6. Add defensive coding suggestions to prevent similar errors
+7. If relevant, suggest optimizations or improvements beyond just fixing the error
+
+Your explanation should be detailed enough for someone to understand both the problem and solution.""",
+
+    # Multiple choice question prompt
+    "multiple_choice": """Analyze the multiple choice question in the screenshots and determine the correct answer.
+
+Instructions:
+1. Identify the specific question being asked
+2. Analyze each of the provided options thoroughly 
+3. Explain the reasoning behind why each incorrect option is wrong
+4. Provide a detailed explanation of why the correct option is right
+5. CLEARLY state your final answer (e.g., "The correct answer is option C")
+6. If applicable, include any relevant examples, definitions or context
+7. For history/science/other factual questions, explain the factual background
+
+Your answer should be confident and well-justified with clear reasoning.""",
+
+    # Large codebase/system design problem prompt
+    "system_design": """Analyze the system design problem shown in the screenshots and provide a comprehensive solution.
+
+Instructions:
+1. Understand the requirements and constraints of the system
+2. Outline a high-level architecture with key components
+3. Detail the data models and database schema if relevant
+4. Explain API designs and communication patterns between components
+5. Discuss scalability considerations and potential bottlenecks
+6. Address security, reliability, and maintenance concerns
+7. Provide diagrams or pseudo-code where helpful
+8. Consider trade-offs in your design and explain your choices
+
+Your solution should be comprehensive while being practical to implement.""",
+}
+
+# Default to the general prompt
+DEFAULT_ANALYSIS_PROMPT = """Examine the screenshots and provide a detailed analysis and solution.
+
+Instructions:
+1. First, identify the type of problem or question being asked
+2. Analyze the content thoroughly and methodically
+3. Provide a clear, structured response that directly addresses the problem
+4. Include code, diagrams, or step-by-step instructions as needed
+5. Ensure your solution is complete and correct
+6. Explain your reasoning and any assumptions you made
+
+Your response should be well-structured with markdown headings and code blocks as appropriate."""
+
+# Special handling for multi-image scenarios
+MULTI_IMAGE_CONTEXT = """
+Note: There are {num_images} screenshots provided. These may represent:
+- Multiple parts of a single problem
+- A problem and its test cases
+- Code and error messages
+- Sequential steps in a larger problem
+
+Ensure you consider all images together as a complete context before providing your solution."""
+
+# Universal guidelines appended to every analysis prompt
+UNIVERSAL_GUIDELINES = """
+
+UNIVERSAL GUIDELINES:
+- Ensure your solution is correct and addresses all aspects of the problem
+- Format your response with clear Markdown headings and sections
+- Use proper code blocks with language tags for any code
+- Be precise and avoid ambiguity in your explanations
+- Write clean, efficient code that follows best practices
+- Format code with proper indentation and readable style"""
+
+# Prompts are assembled once at import; _create_smart_prompt only looks them up
+# (multi-image prompts are stored as the parts around the image count)
+_MULTI_IMAGE_CONTEXT_PREFIX, _MULTI_IMAGE_CONTEXT_SUFFIX = MULTI_IMAGE_CONTEXT.split("{num_images}")
+_SINGLE_IMAGE_PROMPTS = {
+    content_type: ANALYSIS_BASE_INTRO + prompt + UNIVERSAL_GUIDELINES
+    for content_type, prompt in ANALYSIS_PROMPTS.items()
+}
+_SINGLE_IMAGE_DEFAULT_PROMPT = ANALYSIS_BASE_INTRO + DEFAULT_ANALYSIS_PROMPT + UNIVERSAL_GUIDELINES
+_MULTI_IMAGE_PROMPT_PARTS = {
+    content_type: (ANALYSIS_BASE_INTRO + prompt + _MULTI_IMAGE_CONTEXT_PREFIX, _MULTI_IMAGE_CONTEXT_SUFFIX + UNIVERSAL_GUIDELINES)
+    for content_type, prompt in ANALYSIS_PROMPTS.items()
+}
+_MULTI_IMAGE_DEFAULT_PROMPT_PARTS = (
+    ANALYSIS_BASE_INTRO + DEFAULT_ANALYSIS_PROMPT + _MULTI_IMAGE_CONTEXT_PREFIX,
+    _MULTI_IMAGE_CONTEXT_SUFFIX + UNIVERSAL_GUIDELINES,
+)
+
+_shared_http_client = None
+_shared_http_client_lock = threading.Lock()
+
+# Specialized follow-up instructions, indexed by FollowupType.
+# Interned so every follow-up prompt shares the same string objects.
+FOLLOWUP_INSTRUCTIONS = (
+    # FollowupType.ERROR_FIX
+    sys.intern("""Focus on identifying and fixing the specific error or issue mentioned. 
+Provide a complete solution with corrected code and a detailed explanation of what was causing the problem.
+Be precise about what changes need to be made and why they resolve the issue."""),
+    
+    # FollowupType.EXPLANATION
+    sys.intern("""Provide a clear, detailed explanation of the concept or aspect the user is asking about.
+Use analogies, step-by-step breakdowns, or visual descriptions if helpful.
+Make sure your explanation is accessible and tailored to help them genuinely understand the topic."""),
+    
+    # FollowupType.OPTIMIZATION
+    sys.intern("""Analyze the current solution and identify specific opportunities for optimization.
+Explain the performance implications of your suggested improvements (time/space complexity).
+Provide optimized code with comments explaining each optimization technique.
+Compare before and after performance characteristics."""),
+    
+    # FollowupType.ALTERNATIVE
+    sys.intern("""Develop a completely different approach to solving the original problem.
+Explain the key differences between this alternative and the previous solution.
+Discuss the trade-offs between the approaches (simplicity, performance, readability, etc.).
+Provide full implementation of the alternative solution."""),
+    
+    # FollowupType.GENERAL
+    sys.intern("""Address the user's follow-up question directly and thoroughly.
+Provide any additional code, explanations, or resources needed to fully answer their question.
+Make sure your response builds on the context of the previous solution while focusing specifically on what they're asking.""")
+)
+
+# Text that follows the question in a follow-up prompt, indexed by FollowupType
+FOLLOWUP_PROMPT_SUFFIXES = tuple(f"\n\n{instructions}" for instructions in FOLLOWUP_INSTRUCTIONS)
+
+# Returned for follow-ups when config.MOCK_MODE is enabled
+MOCK_FOLLOWUP_RESPONSE = """# Follow-up Response
+
+This is a mock follow-up response. Disable MOCK_MODE in config.py to send follow-up questions to the model."""
+
+@lru_cache(maxsize=32)
+def followup_context_prefix(previous_solution):
+    """Start of the follow-up prompt, which only depends on the previous solution.
+
+    Cached so repeated follow-ups on the same solution reuse the assembled text.
+    """
+    return f"""You previously analyzed a problem and provided this solution:
+
+{previous_solution}
+
+User's follow-up question: """
+
+_event_loop = None
+_event_loop_lock = threading.Lock()
+_shared_async_client = None
+
+def get_event_loop():
+    """Return the background asyncio loop that runs analysis requests, starting it on first use"""
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(target=_event_loop.run_forever, name="ApiClientEventLoop", daemon=True).start()
+            logger.debug("Started background event loop for API requests")
+        return _event_loop
+
+def get_shared_async_client():
+    """Return the AsyncOpenAI client for OpenRouter (must be called on the background event loop)"""
+    global _shared_async_client
+    if _shared_async_client is None:
+        import httpx
+        from openai import AsyncOpenAI
+        _shared_async_client = AsyncOpenAI(
+            base_url=OPENROUTER_BASE_URL,
+            api_key=config.OPENROUTER_API_KEY,
+            http_client=httpx.AsyncClient(**_http_client_options()),
+        )
+    return _shared_async_client
+
+def _http_client_options():
+    """Keyword arguments shared by the sync and async httpx clients"""
+    import httpx
+    options = {
+        "timeout": httpx.Timeout(config.DEFAULT_TIMEOUT, connect=10.0),
+        "limits": httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=300),
+    }
+    # HTTP/2 support is optional (pip install httpx[http2])
+    if importlib.util.find_spec("h2") is not None:
+        options["http2"] = True
+    return options
+
+def get_shared_http_client():
+    """Return the process-wide httpx client used for OpenRouter requests, creating it on first use"""
+    global _shared_http_client
+    with _shared_http_client_lock:
+        if _shared_http_client is None:
+            import httpx
+            _shared_http_client = httpx.Client(**_http_client_options())
+            logger.debug("Created shared httpx client for OpenRouter")
+        return _shared_http_client
+
+def load_screenshot(image_data):
+    """Return a screenshot as a PIL image: captured frames already are one, encoded bytes are decoded.
+
+    The result may be the frame the app is holding, so callers must not modify or close it.
+    """
+    from PIL import Image
+    if isinstance(image_data, Image.Image):
+        return image_data
+    return Image.open(BytesIO(image_data))
+
+def compute_image_hash(image_data):
+    """Difference hash of a screenshot (one bit per horizontal brightness gradient), for spotting repeats"""
+    from PIL import Image
+    size = DETECTION_HASH_SIZE
+    pixels = load_screenshot(image_data).convert('L').resize((size + 1, size), Image.Resampling.BILINEAR).tobytes()
+    image_hash = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            image_hash = (image_hash << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return image_hash
+
+# Encode buffers are kept per worker thread and rewound rather than reallocated
+_encode_buffers = threading.local()
+
+def encode_jpeg(img):
+    """Encode an RGB image as JPEG bytes using the calling thread's reusable buffer"""
+    buffer = getattr(_encode_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _encode_buffers.buffer = BytesIO()
+    # Rewind instead of truncating: truncate() would release the grown allocation
+    buffer.seek(0)
+    # No optimize pass: the extra Huffman-table pass costs more time than the few percent it saves
+    img.save(buffer, format="JPEG", quality=config.UPLOAD_IMAGE_JPEG_QUALITY, optimize=False)
+    size = buffer.tell()
+    with buffer.getbuffer() as view:
+        return bytes(view[:size])
+
+def build_image_part(image_data):
+    """Downscale a screenshot to the configured max edge and wrap it as a JPEG data URI message part.
+
+    Accepts a captured PIL frame or encoded image bytes. This is the only place captures are
+    encoded, and it runs on worker threads so all screenshots are encoded in parallel.
+    """
+    from PIL import Image
+    try:
+        img = load_screenshot(image_data)
+        scale = config.UPLOAD_IMAGE_MAX_EDGE / max(img.size)
+        if scale < 1:
+            # resize() returns a new image, leaving the stored frame untouched
+            new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        image_bytes = encode_jpeg(img)
+    except Exception as e:
+        if not isinstance(image_data, bytes):
+            raise
+        # Send the original bytes rather than dropping the screenshot
+        logger.warning(f"Could not re-encode screenshot for upload, sending original: {e}")
+        image_bytes = image_data
+    # OpenRouter has no upload endpoint for chat images, so they are sent inline as data URIs.
+    # The part is built once per screenshot and shared by every request that needs it.
+    return {
+        "type": "image_url",
+        "image_url": {"url": f"data:image/jpeg;base64,{b64encode_as_string(image_bytes)}"}
+    }
+
 
 class ApiClient(QObject):
     # Define signals for communication with UI
     output_update_signal = Signal(str)
     status_update_signal = Signal(str)
+    _output_ready_signal = Signal() # Internal wake-up for _deliver_latest_output
     
     # Static class variables to persist data between instances
     _last_problem_data = None
     _last_solution_content = None
     _last_raw_text = None # Added to persist raw text for potential future use
+    _active_request = None # concurrent.futures.Future of the analysis running on the event loop
+    _detection_cache = deque(maxlen=DETECTION_CACHE_SIZE) # (image hash, content type) of recent detections
     
     def __init__(self):
         """Initialize the API client using settings from config.py"""
@@ -41,26 +411,14 @@ class ApiClient(QObject):
         self.start_time = time.time()
         self.openrouter_api_key = config.OPENROUTER_API_KEY
         
-        # Initialize OpenAI client for OpenRouter
+        # The OpenAI client for OpenRouter is created on first use (see the client property),
+        # so the SDK is only imported once a real request is about to be made
+        self._client = None
         if not self.openrouter_api_key:
             logger.error("OPENROUTER_API_KEY not found in config or environment.")
             self.status_update_signal.emit("Error: OPENROUTER_API_KEY not set.")
-            self.client = None
         else:
-            # Explicitly create an httpx client instance.
-            http_client_instance = httpx.Client(timeout=config.DEFAULT_TIMEOUT) # Use timeout from config
-
-            self.client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=self.openrouter_api_key,
-                http_client=http_client_instance, # Pass the explicit client
-            )
-            # Optional OpenRouter headers for tracking/ranking
-            self.openrouter_headers = {
-                "HTTP-Referer": config.OPENROUTER_REFERRER_URL,
-                "X-Title": config.OPENROUTER_SITE_TITLE,
-            }
-            logger.info("OpenAI client initialized for OpenRouter.")
+            self.openrouter_headers = OPENROUTER_HEADERS
         
         # Model configuration (from config.py)
         self.model_name = config.DEFAULT_MODEL_NAME
@@ -73,6 +431,11 @@ class ApiClient(QObject):
         self.retry_count = config.DEFAULT_RETRY_COUNT
         # Timeout is now set in the httpx client above
         
+        # Latest streamed output waiting to be delivered (see _publish_output)
+        self._latest_output_lock = threading.Lock()
+        self._latest_output = None
+        self._output_ready_signal.connect(self._deliver_latest_output)
+        
         # State tracking
         self.last_solution_content = ApiClient._last_solution_content
         self.current_output_content = None
@@ -89,20 +452,64 @@ class ApiClient(QObject):
         """Prune log files to prevent them from growing too large"""
         try:
             log_dir = os.path.dirname(os.path.abspath(__file__))
-            for file in os.listdir(log_dir):
-                if file.endswith('.log'):
-                    file_path = os.path.join(log_dir, file)
-                    size_mb = os.path.getsize(file_path) / (1024 * 1024)  # Convert to MB
+            with os.scandir(log_dir) as entries:
+                for entry in entries:
+                    if not (entry.name.endswith('.log') and entry.is_file(follow_symlinks=False)):
+                        continue
+                    file = entry.name
+                    file_path = entry.path
+                    size_bytes = entry.stat(follow_symlinks=False).st_size
+                    size_mb = size_bytes / (1024 * 1024)  # Convert to MB
                     if size_mb > self.max_log_size_mb:
-                        # Truncate log file to half its size
-                        with open(file_path, 'r') as f:
-                            content = f.read()
-                        with open(file_path, 'w') as f:
-                            f.write(content[len(content)//2:])
+                        # Keep the second half of the file, starting at the next full line.
+                        # The file is memory-mapped so the cut point is found and the tail moved
+                        # to the front without copying the log into Python objects.
+                        with open(file_path, 'r+b') as f:
+                            with mmap.mmap(f.fileno(), 0) as mm:
+                                cut = mm.find(b'\n', size_bytes // 2) + 1 or size_bytes // 2
+                                remaining = len(mm) - cut
+                                mm.move(0, cut, remaining)
+                                mm.flush()
+                            f.truncate(remaining)
                         logger.info(f"Pruned log file {file} from {size_mb:.2f}MB to {size_mb/2:.2f}MB")
         except Exception as e:
             logger.warning(f"Failed to prune log files: {e}")
 
+    @property
+    def client(self):
+        """OpenAI SDK client for OpenRouter, or None if no API key is configured"""
+        if self._client is None and self.openrouter_api_key:
+            from openai import OpenAI
+
+            # Share one pooled httpx client across instances so connections (and TLS) are reused
+            self._client = OpenAI(
+                base_url=OPENROUTER_BASE_URL,
+                api_key=self.openrouter_api_key,
+                http_client=get_shared_http_client(),
+            )
+            logger.info("OpenAI client initialized for OpenRouter.")
+        return self._client
+
+    def _publish_output(self, text):
+        """Store the latest output text and wake the thread that owns this client to deliver it.
+
+        Only the newest text is kept, so if the UI falls behind it skips stale
+        intermediate frames instead of queueing one event per update.
+        """
+        with self._latest_output_lock:
+            wake = self._latest_output is None
+            self._latest_output = text
+        if wake:
+            self._output_ready_signal.emit()
+
+    @Slot()
+    def _deliver_latest_output(self):
+        """Emit the most recent output published by the worker"""
+        with self._latest_output_lock:
+            text, self._latest_output = self._latest_output, None
+        if text is not None:
+            self.output_update_signal.emit(text)
+
     def set_model_params(self, temperature=None, max_tokens=None):
         """Set generation parameters for the model"""
         if temperature is not None:
@@ -123,8 +530,11 @@ class ApiClient(QObject):
         Process images using OpenAI SDK via OpenRouter
         
         Args:
-            image_data_list: List of image data in bytes
+            image_data_list: List of captured screenshots (PIL images or encoded image bytes)
             fast_mode: If True, skip content detection and use the fast model.
+
+        Returns:
+            The concurrent.futures.Future of the analysis, or None if it could not be started.
         """
         logger.debug(f"[ApiClient.process_images] Received call with fast_mode={fast_mode}")
 
@@ -137,171 +547,249 @@ class ApiClient(QObject):
         logger.debug(f"Starting processing timer at {self.start_time}")
         self.status_update_signal.emit("Processing screenshots...")
         
-        encoded_images = [
-            base64.b64encode(img).decode('utf-8')
-            for img in image_data_list
-        ]
-        
-        logger.debug(f"[ApiClient.process_images] Starting thread _process_images_thread with fast_mode={fast_mode}")
-        processing_thread = threading.Thread(
-            target=self._process_images_thread,
-            args=(encoded_images, fast_mode), # Pass fast_mode to the thread
-            daemon=True
+        # Only one analysis runs at a time; a new request aborts the previous one
+        if ApiClient.cancel_active_request():
+            logger.info("Cancelled previous analysis request")
+
+        logger.debug(f"[ApiClient.process_images] Scheduling _process_images_async with fast_mode={fast_mode}")
+        ApiClient._active_request = asyncio.run_coroutine_threadsafe(
+            self._process_images_async(image_data_list, fast_mode),
+            get_event_loop()
         )
-        processing_thread.start()
-    
-    def _process_images_thread(self, encoded_images, fast_mode=False):
-        """Thread function to process images via OpenRouter"""
-        logger.debug(f"[ApiClient._process_images_thread] Thread started with fast_mode={fast_mode}")
+        return ApiClient._active_request
+
+    @staticmethod
+    def cancel_active_request():
+        """Abort the analysis running on the background event loop, if any.
+
+        Returns True if a request was still running and has been cancelled.
+        """
+        request = ApiClient._active_request
+        if request is None or request.done():
+            return False
+        # Cancellation is delivered to the coroutine on the event loop, which closes its streams
+        return request.cancel()
+
+    async def _process_images_async(self, image_data_list, fast_mode=False):
+        """Coroutine (on the background event loop) that runs content detection and the main analysis"""
+        logger.debug(f"[ApiClient._process_images_async] Started with fast_mode={fast_mode}")
 
-        if not self.client:
-            logger.error("OpenAI client not initialized. Cannot process images.")
-            return
-            
         try:
-            total_images = len(encoded_images)
-            self.status_update_signal.emit(f"Processing {total_images} image(s)...")
-            
-            current_model = self.model_name # Default model
-            short_detection_model = get_short_model_name(self.detection_model_name)
-            short_fast_model = get_short_model_name(self.fast_model_name)
-            short_default_model = get_short_model_name(self.model_name)
+            # Downscale and encode screenshots in parallel (PIL and the encoder release the GIL).
+            # A frame stored more than once (repeated identical captures) is encoded once.
+            unique_frames = list({id(img): img for img in image_data_list}.values())
+            unique_parts = await asyncio.gather(
+                *(asyncio.to_thread(build_image_part, img) for img in unique_frames)
+            )
+            parts_by_frame = {id(img): part for img, part in zip(unique_frames, unique_parts)}
+            image_parts = [parts_by_frame[id(img)] for img in image_data_list]
+            logger.debug(f"Encoded {len(image_parts)} image(s) at +{time.time() - self.start_time:.2f}s")
 
+            await self._analyze_images(get_shared_async_client(), image_data_list, image_parts, fast_mode)
+        except asyncio.CancelledError:
+            logger.info("Analysis request cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Error in image processing: {str(e)}")
+            logger.error(traceback.format_exc())
+            self.status_update_signal.emit(f"Error processing images: {str(e)}")
+
+    async def _analyze_images(self, async_client, image_data_list, image_parts, fast_mode=False):
+        """Run content detection and the streaming analysis for the encoded screenshots"""
+        total_images = len(image_parts)
+        self.status_update_signal.emit(f"Processing {total_images} image(s)...")
+        
+        current_model = self.model_name # Default model
+        short_detection_model = get_short_model_name(self.detection_model_name)
+        short_fast_model = get_short_model_name(self.fast_model_name)
+        short_default_model = get_short_model_name(self.model_name)
+
+        try:
             if fast_mode:
                 content_type = config.FAST_MODE_DEFAULT_CONTENT_TYPE
                 current_model = self.fast_model_name
                 self.status_update_signal.emit(f"Fast Mode: Analyzing ({short_fast_model}) | Type: '{content_type}'")
                 logger.info(f"Fast Mode enabled. Skipping detection, using model: {current_model}, type: {content_type}")
+                stream = await self._create_analysis_stream(async_client, current_model, image_parts, content_type)
             else:
                 self.status_update_signal.emit(f"Detecting content ({short_detection_model})...")
-                detected_content_type = self._detect_content_type(encoded_images)
-                self.status_update_signal.emit(f"Detected: {detected_content_type} | Analyzing ({short_default_model})...")
-                logger.info(f"Using prompt type: {detected_content_type} for analysis with {current_model}")
+                detection_task = asyncio.create_task(self._detect_content_type(async_client, image_data_list, image_parts))
 
-                # --- Removing Temporary Debugging Code --- 
-                # Set the content_type for the prompt based on detection result
-                content_type = detected_content_type 
-                # logger.warning(f"[TEMP DEBUG] Overriding content_type to '{content_type}' for prompt generation.")
-                # ----------------------------------------
+                # Speculatively start a 'general' analysis while detection runs; it is kept
+                # only if detection agrees, otherwise it is cancelled before any output is shown
+                speculative_task = None
+                if config.SPECULATIVE_ANALYSIS:
+                    speculative_task = asyncio.create_task(
+                        self._create_analysis_stream(async_client, current_model, image_parts, "general")
+                    )
 
-            prompt = self._create_smart_prompt(total_images, content_type)
+                try:
+                    content_type = await detection_task
+                except asyncio.CancelledError:
+                    # Request superseded while detecting; don't leave the helper requests running
+                    detection_task.cancel()
+                    if speculative_task:
+                        await self._discard_speculative_stream(speculative_task)
+                    raise
+                self.status_update_signal.emit(f"Detected: {content_type} | Analyzing ({short_default_model})...")
+                logger.info(f"Using prompt type: {content_type} for analysis with {current_model}")
 
-            # Prepare messages for OpenAI SDK multimodal format
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt}
-                    ]
-                }
-            ]
-            # Add images to the content list
-            for encoded_image in encoded_images:
-                # Format as data URI for base64 images
-                image_url = f"data:image/jpeg;base64,{encoded_image}"
-                messages[0]["content"].append({
-                    "type": "image_url",
-                    "image_url": {"url": image_url}
-                })
-
-            prompt_preview = prompt[:100] + "..." if len(prompt) > 100 else prompt
-            logger.debug(f"Using prompt (preview): {prompt_preview}")
-            logger.debug(f"Sending request to OpenRouter model: {current_model}")
+                stream = None
+                if speculative_task:
+                    if content_type == "general":
+                        try:
+                            stream = await speculative_task
+                            logger.debug("Detection matched speculative 'general' analysis, reusing its stream")
+                        except Exception as e:
+                            logger.warning(f"Speculative analysis request failed, retrying: {e}")
+                    else:
+                        await self._discard_speculative_stream(speculative_task)
+                if stream is None:
+                    stream = await self._create_analysis_stream(async_client, current_model, image_parts, content_type)
 
+            stream_start = time.time()
+            logger.debug(f"Solution streaming started at +{stream_start - self.start_time:.2f}s")
+            problem_title = f"# {content_type.title()} Analysis\n\n"
+            
+            # Coalesce tokens so the UI is updated a few times per second rather than per token
+            buffer = StringIO()
+            pending_chunks = 0
+            last_emit = time.monotonic()
+            # Hot loop: bind methods and settings to locals to skip repeated lookups per token
+            write = buffer.write
+            getvalue = buffer.getvalue
+            publish = self._publish_output
+            monotonic = time.monotonic
+            max_chunks = STREAM_UPDATE_MAX_CHUNKS
+            interval = STREAM_UPDATE_INTERVAL
             try:
-                # Decide whether to stream based on a flag or setting (using stream=False for now)
-                should_stream = True # Set this based on config or testing needs
-                
-                if should_stream:
-                    stream = self.client.chat.completions.create(
-                        model=current_model, # Use the selected model
-                        messages=messages,
-                        temperature=self.temperature,
-                        max_tokens=self.max_tokens,
-                        top_p=0.95,
-                        stream=True,
-                        extra_headers=self.openrouter_headers
-                    )
-                    
-                    solution_content = ""
-                    stream_start = time.time()
-                    logger.debug(f"Solution streaming started at +{stream_start - self.start_time:.2f}s")
-                    problem_title = f"# {content_type.title()} Analysis\n\n"
-                    
-                    for chunk in stream:
-                        delta = chunk.choices[0].delta
-                        if delta and delta.content:
-                            solution_content += delta.content
-                            self.output_update_signal.emit(problem_title + solution_content)
-                            
-                    # Final update after stream completes
-                    self.last_solution_content = solution_content
-                    ApiClient._last_solution_content = solution_content
-                    self.last_raw_text = solution_content
-                    ApiClient._last_raw_text = solution_content
-                    
-                    stream_end = time.time()
-                    total_time = stream_end - self.start_time
-                    # Final status indicates completion and includes model used
-                    final_model_short = short_fast_model if fast_mode else short_default_model
-                    self.status_update_signal.emit(f"Analysis complete ({final_model_short}) in {total_time:.2f}s")
-                    
-                else: # Handle non-streaming response
-                    response = self.client.chat.completions.create(
-                        model=current_model, # Use the selected model
-                        messages=messages,
-                        temperature=self.temperature,
-                        max_tokens=self.max_tokens,
-                        stream=False,
-                        extra_headers=self.openrouter_headers
-                    )
-                    
-                    request_end = time.time()
-                    logger.debug(f"Non-streaming request completed at +{request_end - self.start_time:.2f}s")
-                    
-                    if response.choices:
-                        solution_content = response.choices[0].message.content
-                        problem_title = f"# {content_type.title()} Analysis\n\n"
-                        self.output_update_signal.emit(problem_title + solution_content)
-                        
-                        # Store final solution
-                        self.last_solution_content = solution_content
-                        ApiClient._last_solution_content = solution_content
-                        self.last_raw_text = solution_content
-                        ApiClient._last_raw_text = solution_content
-                        
-                        total_time = request_end - self.start_time
-                        # Final status indicates completion and includes model used
-                        final_model_short = short_fast_model if fast_mode else short_default_model
-                        self.status_update_signal.emit(f"Analysis complete ({final_model_short}) in {total_time:.2f}s")
-                    else:
-                        logger.error("OpenRouter API request error: No response choices received.")
-                        self.status_update_signal.emit("Error: No response choices received.")
-                        
-            except Exception as e:
-                logger.error(f"OpenRouter API request error: {str(e)}")
-                logger.error(traceback.format_exc())
-                self.status_update_signal.emit(f"Error: {str(e)}")
+                async for chunk in stream:
+                    choices = chunk.choices
+                    if not choices:
+                        continue
+                    delta = choices[0].delta
+                    content = delta.content if delta else None
+                    if content:
+                        write(content)
+                        pending_chunks += 1
+                        now = monotonic()
+                        if pending_chunks >= max_chunks or now - last_emit >= interval:
+                            publish(problem_title + getvalue())
+                            pending_chunks = 0
+                            last_emit = now
+            finally:
+                # Release the connection promptly if the request is cancelled mid-stream
+                await stream.close()
+
+            solution_content = buffer.getvalue()
+            if pending_chunks:
+                self._publish_output(problem_title + solution_content)
+
+            # Final update after stream completes
+            self.last_solution_content = solution_content
+            ApiClient._last_solution_content = solution_content
+            self.last_raw_text = solution_content
+            ApiClient._last_raw_text = solution_content
             
+            stream_end = time.time()
+            total_time = stream_end - self.start_time
+            # Final status indicates completion and includes model used
+            final_model_short = short_fast_model if fast_mode else short_default_model
+            self.status_update_signal.emit(f"Analysis complete ({final_model_short}) in {total_time:.2f}s")
+                
         except Exception as e:
-            logger.error(f"Error in image processing thread: {str(e)}")
+            logger.error(f"OpenRouter API request error: {str(e)}")
             logger.error(traceback.format_exc())
-            self.status_update_signal.emit(f"Error processing images: {str(e)}")
-    
-    def _detect_content_type(self, encoded_images):
-        """Detect content type using OpenAI SDK via OpenRouter (using detection model from config)"""
-        if not self.client:
-            logger.error("OpenAI client not initialized. Cannot detect content type.")
-            return "general" # Default if client isn't ready
+            self.status_update_signal.emit(f"Error: {str(e)}")
+
+    async def _create_analysis_stream(self, async_client, model, image_parts, content_type):
+        """Open a streaming analysis completion for the given content type"""
+        prompt = self._create_smart_prompt(len(image_parts), content_type)
+
+        # Prepare messages for OpenAI SDK multimodal format (prompt followed by all images)
+        messages = [
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": prompt}, *image_parts]
+            }
+        ]
+
+        prompt_preview = prompt[:100] + "..." if len(prompt) > 100 else prompt
+        logger.debug(f"Using prompt (preview): {prompt_preview}")
+        logger.debug(f"Sending request to OpenRouter model: {model} (type: {content_type})")
+
+        return await async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            top_p=0.95,
+            stream=True,
+            extra_headers=self.openrouter_headers
+        )
 
+    async def _discard_speculative_stream(self, speculative_task):
+        """Cancel a speculative analysis request, closing its stream if it already opened"""
+        if not speculative_task.done():
+            speculative_task.cancel()
         try:
-            first_image_data = encoded_images[0] if encoded_images else None
-            if not first_image_data:
+            stream = await speculative_task
+            await stream.close()
+        except (asyncio.CancelledError, Exception) as e:
+            logger.debug(f"Speculative analysis discarded: {type(e).__name__}")
+        else:
+            logger.debug("Speculative analysis stream closed")
+    
+    async def _detect_content_type(self, async_client, image_data_list, image_parts):
+        """Detect content type, reusing the result for screenshots that look like a recent one"""
+        try:
+            first_image_part = image_parts[0] if image_parts else None
+            if not first_image_part:
                 logger.warning("No images provided for content detection")
                 return "coding"
             
-            self.status_update_signal.emit(f"Running content detection with {self.detection_model_name}...") # Show model used
-            detection_prompt = """ONLY respond with one of these exact words based on what you see in the image:
+            image_hash = await asyncio.to_thread(compute_image_hash, image_data_list[0])
+            cached_content_type = self._get_cached_content_type(image_hash)
+            if cached_content_type:
+                logger.info(f"Content type reused from a similar screenshot: {cached_content_type}")
+                return cached_content_type
+
+            content_type = await self._classify_content_type(async_client, image_data_list[0], first_image_part)
+            if content_type is None:
+                # Detection failed; the fallback isn't cached, so similar screenshots are detected again
+                logger.warning("Content type could not be detected, defaulting to 'general'")
+                return "general"
+            ApiClient._detection_cache.append((image_hash, content_type))
+            return content_type
+        
+        except Exception as e:
+            logger.error(f"Error in content type detection: {str(e)}")
+            logger.error(traceback.format_exc())
+            return "general"
+
+    def _get_cached_content_type(self, image_hash):
+        """Return the cached content type of the closest recent screenshot within the hash distance limit"""
+        best_type, best_distance = None, DETECTION_CACHE_MAX_DISTANCE + 1
+        for cached_hash, content_type in ApiClient._detection_cache:
+            distance = bin(image_hash ^ cached_hash).count('1')
+            if distance < best_distance:
+                best_type, best_distance = content_type, distance
+        return best_type
+
+    async def _classify_content_type(self, async_client, image_data, image_part):
+        """Classify a screenshot with local OCR rules, falling back to the detection model from config.
+
+        Returns None if neither the detection model nor the secondary detection gave a usable answer.
+        """
+        # Try cheap local OCR rules first; only ask the detection model if they are inconclusive
+        if OCR_AVAILABLE and config.LOCAL_CONTENT_DETECTION:
+            local_content_type = await asyncio.to_thread(self._detect_content_type_locally, image_data)
+            if local_content_type:
+                logger.info(f"Content type detected locally: {local_content_type}")
+                return local_content_type
+        
+        self.status_update_signal.emit(f"Running content detection with {self.detection_model_name}...") # Show model used
+        detection_prompt = """ONLY respond with one of these exact words based on what you see in the image:
 - "coding" - if this shows a coding/programming problem or code snippet
 - "multiple_choice" - if this shows a multiple choice question or quiz (including history, science, etc.)
 - "debugging" - if this shows an error message or debugging scenario
@@ -310,76 +798,91 @@ class ApiClient(QObject):
 
 RESPOND ONLY with the single most appropriate word from the list above, nothing else.
 Example: If you see multiple choice history questions, respond with ONLY: multiple_choice"""
-            
-            # Prepare messages for OpenAI SDK multimodal format
-            image_url = f"data:image/jpeg;base64,{first_image_data}"
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": detection_prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": image_url}
-                        }
-                    ]
-                }
-            ]
-
-            logger.debug(f"Sending detection request to OpenRouter model: {self.detection_model_name}")
-            detection_response = self.client.chat.completions.create(
-                model=self.detection_model_name, # Use the detection model from config
-                messages=messages,
-                temperature=0.1,
-                max_tokens=10,
-                top_p=0.95,
-                stream=False, # No need to stream for detection
-                extra_headers=self.openrouter_headers # Pass optional headers
-            )
-            
-            raw_response = detection_response.choices[0].message.content.strip().lower()
-            logger.debug(f"Raw detection response: '{raw_response}'")
-            
-            content_type = raw_response.replace('"', '').replace("'", "").strip('.')
-            content_type = content_type.split()[0] if content_type else ""
-            
-            type_mapping = {
-                "mcq": "multiple_choice", "quiz": "multiple_choice", "question": "multiple_choice",
-                "questions": "multiple_choice", "test": "multiple_choice",
-                "error": "debugging", "bug": "debugging", "issue": "debugging", "exception": "debugging",
-                "program": "coding", "algorithm": "coding", "leetcode": "coding", "hackerrank": "coding",
-                "design": "system_design", "architecture": "system_design", "diagram": "system_design"
+        
+        # Prepare messages for OpenAI SDK multimodal format
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": detection_prompt},
+                    image_part
+                ]
             }
+        ]
+
+        logger.debug(f"Sending detection request to OpenRouter model: {self.detection_model_name}")
+        detection_response = await async_client.chat.completions.create(
+            model=self.detection_model_name, # Use the detection model from config
+            messages=messages,
+            temperature=0.1,
+            max_tokens=10,
+            top_p=0.95,
+            stream=False, # No need to stream for detection
+            extra_headers=self.openrouter_headers # Pass optional headers
+        )
+        
+        raw_response = detection_response.choices[0].message.content.strip().lower()
+        logger.debug(f"Raw detection response: '{raw_response}'")
+        
+        # First word of the response, ignoring quotes and punctuation
+        word_match = DETECTION_WORD_PATTERN.search(raw_response)
+        content_type = word_match.group(0) if word_match else ""
+        content_type = DETECTION_TYPE_MAPPING.get(content_type, content_type)
+        
+        if content_type not in VALID_CONTENT_TYPES:
+            # Resolve near-misses like 'multiplechoice' locally before asking the model again
+            close_matches = difflib.get_close_matches(content_type, DETECTION_MATCH_CANDIDATES, n=1, cutoff=0.8)
+            if close_matches:
+                logger.debug(f"Fuzzy-matched detection response '{content_type}' to '{close_matches[0]}'")
+                content_type = DETECTION_TYPE_MAPPING.get(close_matches[0], close_matches[0])
+        
+        logger.info(f"Content type detected: {content_type}")
+        
+        if content_type not in VALID_CONTENT_TYPES:
+            # Use secondary detection if primary fails
+            secondary_content_type = await self._secondary_content_detection(async_client, image_part)
+            if secondary_content_type in VALID_CONTENT_TYPES:
+                 logger.info(f"Using secondary detection result: {secondary_content_type}")
+                 return secondary_content_type
+                
+            logger.warning(f"Unknown content type detected: '{content_type}'")
+            return None
             
-            if content_type in type_mapping:
-                content_type = type_mapping[content_type]
-            
-            logger.info(f"Content type detected: {content_type}")
+        return content_type
             
-            valid_types = ["coding", "multiple_choice", "debugging", "system_design", "general"]
-            if content_type not in valid_types:
-                # Use secondary detection if primary fails
-                secondary_content_type = self._secondary_content_detection(first_image_data)
-                if secondary_content_type in valid_types:
-                     logger.info(f"Using secondary detection result: {secondary_content_type}")
-                     return secondary_content_type
-                    
-                logger.warning(f"Unknown content type detected: '{content_type}', defaulting to 'general'")
-                return "general"
-                
-            return content_type
-        
+    def _detect_content_type_locally(self, image_data):
+        """Classify the first screenshot from its OCR text using keyword rules.
+
+        Returns None if OCR fails or no rule matches, so the caller can fall back to the model.
+        """
+        global OCR_AVAILABLE
+        try:
+            import pytesseract
+        except ImportError as e:
+            # Installed but not importable (e.g. a broken dependency); use the detection model from now on
+            logger.warning(f"pytesseract could not be imported, disabling local content detection: {e}")
+            OCR_AVAILABLE = False
+            return None
+        try:
+            text = pytesseract.image_to_string(load_screenshot(image_data))
+        except pytesseract.TesseractNotFoundError:
+            logger.warning("Tesseract binary not found, disabling local content detection")
+            OCR_AVAILABLE = False
+            return None
         except Exception as e:
-            logger.error(f"Error in content type detection: {str(e)}")
-            logger.error(traceback.format_exc())
-            return "general"
-            
-    def _secondary_content_detection(self, encoded_image):
-        """Fallback content detection using OpenAI SDK via OpenRouter (using detection model from config)"""
-        if not self.client:
-            logger.error("OpenAI client not initialized. Cannot run secondary detection.")
-            return "general"
+            logger.warning(f"Local OCR content detection failed: {e}")
+            return None
+
+        for pattern, content_type in LOCAL_DETECTION_RULES:
+            if pattern.search(text):
+                return content_type
+        return None
 
+    async def _secondary_content_detection(self, async_client, image_part):
+        """Fallback content detection using OpenAI SDK via OpenRouter (using detection model from config).
+
+        Returns None if the request fails.
+        """
         try:
             self.status_update_signal.emit(f"Running secondary content detection with {self.detection_model_name}...") # Show model used
             logger.info("Using secondary content detection method")
@@ -396,22 +899,18 @@ Format your response exactly like this example:
 3. no
 4. no"""
 
-            image_url = f"data:image/jpeg;base64,{encoded_image}"
             messages = [
                 {
                     "role": "user",
                     "content": [
                         {"type": "text", "text": detection_prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": image_url}
-                        }
+                        image_part
                     ]
                 }
             ]
 
             logger.debug(f"Sending secondary detection request to OpenRouter model: {self.detection_model_name}")
-            detection_response = self.client.chat.completions.create(
+            detection_response = await async_client.chat.completions.create(
                 model=self.detection_model_name, # Use detection model from config
                 messages=messages,
                 temperature=0.1,
@@ -424,12 +923,8 @@ Format your response exactly like this example:
             response_text = detection_response.choices[0].message.content.lower()
             logger.debug(f"Secondary detection response: {response_text}")
             
-            yes_responses = []
-            for i, line in enumerate(response_text.split('\n')):
-                # Check more robustly for 'yes'
-                clean_line = line.strip().lower()
-                if clean_line.endswith('yes') or clean_line == 'yes':
-                    yes_responses.append(i + 1)
+            # Single scan for the numbered answers that are 'yes'
+            yes_responses = {int(number) for number in SECONDARY_YES_PATTERN.findall(response_text)}
             
             logger.debug(f"Secondary detection 'yes' answers for lines: {yes_responses}")
 
@@ -442,130 +937,37 @@ Format your response exactly like this example:
         except Exception as e:
             logger.error(f"Error in secondary content detection: {str(e)}")
             logger.error(traceback.format_exc())
-            return "general"
+            return None
     
     def _create_smart_prompt(self, num_images, content_type="coding"):
         """Create a smart prompt based on the number of images and detected content type"""
-        
-        # Base prompt components
-        base_intro = "You are an expert coding assistant. "
-        
-        # Different prompt types
-        prompts = {
-            # Standard coding problem prompt (e.g., LeetCode, HackerRank)
-            "coding": f"""Examine the screenshots of a programming problem and solve it.
-
-Instructions:
-1. Analyze the problem shown in the screenshots in detail
-2. Provide a step-by-step approach to solving the problem
-3. Include time and space complexity analysis
-4. Implement an efficient solution in the language shown in the problem 
-5. Use the EXACT function signature/template as provided in the problem
-6. Do not add extra type hints or modify the signature
-7. Add detailed comments explaining your solution
-8. Provide a walkthrough of your solution with at least one example
-9. Discuss any optimization techniques or potential edge cases
-
-Your solution should be complete and ready to submit.""",
-
-            # Debugging prompt - when screenshots likely contain error messages
-            "debugging": f"""Examine the error/issue in the screenshots and provide a solution.
-
-Instructions:
-1. Identify the specific error or issue shown in the screenshots
-2. Explain the root cause of the problem in detail
-3. Provide a complete solution or fix for the issue
-4. Include corrected code that resolves the problem
-5. Explain your changes and why they fix the issue
-6. Add defensive coding suggestions to prevent similar errors
-7. If relevant, suggest optimizations or improvements beyond just fixing the error
-
-Your explanation should be detailed enough for someone to understand both the problem and solution.""",
-
-            # Multiple choice question prompt
-            "multiple_choice": f"""Analyze the multiple choice question in the screenshots and determine the correct answer.
-
-Instructions:
-1. Identify the specific question being asked
-2. Analyze each of the provided options thoroughly 
-3. Explain the reasoning behind why each incorrect option is wrong
-4. Provide a detailed explanation of why the correct option is right
-5. CLEARLY state your final answer (e.g., "The correct answer is option C")
-6. If applicable, include any relevant examples, definitions or context
-7. For history/science/other factual questions, explain the factual background
-
-Your answer should be confident and well-justified with clear reasoning.""",
-
-            # Large codebase/system design problem prompt
-            "system_design": f"""Analyze the system design problem shown in the screenshots and provide a comprehensive solution.
-
-Instructions:
-1. Understand the requirements and constraints of the system
-2. Outline a high-level architecture with key components
-3. Detail the data models and database schema if relevant
-4. Explain API designs and communication patterns between components
-5. Discuss scalability considerations and potential bottlenecks
-6. Address security, reliability, and maintenance concerns
-7. Provide diagrams or pseudo-code where helpful
-8. Consider trade-offs in your design and explain your choices
-
-Your solution should be comprehensive while being practical to implement.""",
-        }
-        
-        # Default to the general prompt
-        default_prompt = f"""Examine the screenshots and provide a detailed analysis and solution.
-
-Instructions:
-1. First, identify the type of problem or question being asked
-2. Analyze the content thoroughly and methodically
-3. Provide a clear, structured response that directly addresses the problem
-4. Include code, diagrams, or step-by-step instructions as needed
-5. Ensure your solution is complete and correct
-6. Explain your reasoning and any assumptions you made
-
-Your response should be well-structured with markdown headings and code blocks as appropriate."""
-
-        # Special handling for multi-image scenarios
         if num_images > 3:
-            multi_image_context = f"""
-Note: There are {num_images} screenshots provided. These may represent:
-- Multiple parts of a single problem
-- A problem and its test cases
-- Code and error messages
-- Sequential steps in a larger problem
-
-Ensure you consider all images together as a complete context before providing your solution."""
-        else:
-            multi_image_context = ""
-
-        # Combine the components - use the detected content type prompt
-        final_prompt = base_intro + prompts.get(content_type, default_prompt) + multi_image_context
-        
-        # Add universal guidelines
-        universal_guidelines = """
-
-UNIVERSAL GUIDELINES:
-- Ensure your solution is correct and addresses all aspects of the problem
-- Format your response with clear Markdown headings and sections
-- Use proper code blocks with language tags for any code
-- Be precise and avoid ambiguity in your explanations
-- Write clean, efficient code that follows best practices
-- Format code with proper indentation and readable style"""
-
-        return final_prompt + universal_guidelines
+            prefix, suffix = _MULTI_IMAGE_PROMPT_PARTS.get(content_type, _MULTI_IMAGE_DEFAULT_PROMPT_PARTS)
+            return f"{prefix}{num_images}{suffix}"
+        return _SINGLE_IMAGE_PROMPTS.get(content_type, _SINGLE_IMAGE_DEFAULT_PROMPT)
     
     def process_followup(self, question_text):
-        """Process a follow-up question using OpenAI SDK via OpenRouter"""
+        """Process a follow-up question using OpenAI SDK via OpenRouter.
+
+        Returns True if a response was published to output_update_signal.
+        """
+        if config.MOCK_MODE:
+            # The answer is canned, so skip prompt assembly and the API client entirely
+            logger.debug("Using mock follow-up response (MOCK_MODE is enabled)")
+            self._publish_output(MOCK_FOLLOWUP_RESPONSE)
+            self.status_update_signal.emit("Follow-up complete (mock)")
+            return True
+
         if not self.client:
             logger.error("OpenAI client not initialized. Cannot process followup.")
             self.status_update_signal.emit("Error: API Client not initialized.")
-            return
+            return False
 
         # Check using last_solution_content, as last_raw_text persistence was unreliable
         if not self.last_solution_content:
             logger.warning("Follow-up requested, but self.last_solution_content is empty.")
             self.status_update_signal.emit("No previous analysis found to follow up on")
-            return
+            return False
 
         self.status_update_signal.emit(f"Processing follow-up request with {self.model_name}...")
         self.start_time = time.time()
@@ -578,18 +980,18 @@ UNIVERSAL GUIDELINES:
         #     daemon=True
         # )
         # thread.start()
-        self._process_followup_thread(question_text) # Call directly
+        return self._process_followup_thread(question_text) # Call directly
     
     def _process_followup_thread(self, question_text):
         """Thread function to process follow-up questions via OpenRouter"""
         if not self.client:
             logger.error("OpenAI client not initialized. Cannot process followup.")
-            return
+            return False
             
         try:
             followup_type = self._categorize_followup(question_text)
             prompt = self._create_followup_prompt(question_text, followup_type)
-            logger.debug(f"Using follow-up prompt type: {followup_type}")
+            logger.debug(f"Using follow-up prompt type: {followup_type.name.lower()}")
             
             # Prepare messages for OpenAI format (no images in follow-up)
             messages = [
@@ -613,46 +1015,63 @@ UNIVERSAL GUIDELINES:
                 )
             
                 followup_content = "# Follow-up Response\n\n"
-                solution_content = ""
                 
+                # Coalesce tokens so the UI is updated a few times per second rather than per token
+                buffer = StringIO()
+                pending_chunks = 0
+                last_emit = time.monotonic()
+                # Hot loop: bind methods and settings to locals to skip repeated lookups per token
+                write = buffer.write
+                getvalue = buffer.getvalue
+                publish = self._publish_output
+                monotonic = time.monotonic
+                max_chunks = STREAM_UPDATE_MAX_CHUNKS
+                interval = STREAM_UPDATE_INTERVAL
                 for chunk in stream:
-                    delta = chunk.choices[0].delta
-                    if delta and delta.content:
-                        solution_content += delta.content
-                        self.output_update_signal.emit(followup_content + solution_content)
+                    choices = chunk.choices
+                    if not choices:
+                        continue
+                    delta = choices[0].delta
+                    content = delta.content if delta else None
+                    if content:
+                        write(content)
+                        pending_chunks += 1
+                        now = monotonic()
+                        if pending_chunks >= max_chunks or now - last_emit >= interval:
+                            publish(followup_content + getvalue())
+                            pending_chunks = 0
+                            last_emit = now
+
+                if pending_chunks:
+                    self._publish_output(followup_content + buffer.getvalue())
                 
                 total_time = time.time() - self.start_time
                 # Final status indicates completion and includes model used
                 self.status_update_signal.emit(f"Follow-up complete ({short_followup_model}) in {total_time:.2f}s")
+                return buffer.tell() > 0
             
             except Exception as e:
                 logger.error(f"OpenRouter Follow-up error: {str(e)}")
                 logger.error(traceback.format_exc())
                 self.status_update_signal.emit(f"Error processing follow-up: {str(e)}")
+                return False
             
         except Exception as e:
             logger.error(f"Error in follow-up thread: {str(e)}")
             self.status_update_signal.emit(f"Error: {str(e)}")
+            return False
             
     def _categorize_followup(self, question_text):
         """Categorize the type of follow-up question"""
         question_lower = question_text.lower()
         
-        # Check for specific follow-up types
-        if any(term in question_lower for term in ['error', 'bug', 'fix', 'wrong', 'incorrect', 'not working']):
-            return "error_fix"
-        
-        if any(term in question_lower for term in ['explain', 'clarify', 'help understand', 'how does']):
-            return "explanation"
-        
-        if any(term in question_lower for term in ['optimize', 'faster', 'better', 'improve', 'efficient', 'performance']):
-            return "optimization"
-        
-        if any(term in question_lower for term in ['alternative', 'other way', 'different approach', 'another solution']):
-            return "alternative"
+        # Check for specific follow-up types (first matching category wins)
+        for followup_type, pattern in FOLLOWUP_PATTERNS:
+            if pattern.search(question_lower):
+                return followup_type
             
         # Default to general follow-up
-        return "general"
+        return FollowupType.GENERAL
     
     def _create_followup_prompt(self, question_text, followup_type):
         """Create a specialized follow-up prompt based on the type"""
@@ -662,45 +1081,10 @@ UNIVERSAL GUIDELINES:
             # Fallback if somehow last_solution_content is empty
             logger.warning("Attempting to create follow-up prompt, but self.last_solution_content is empty.")
             # Provide a minimal context to avoid errors, though the result might be poor
-            base_context = f"User's follow-up question: {question_text}\n\nProvide a general answer."
-        else:
-            base_context = f"""You previously analyzed a problem and provided this solution:
+            return f"User's follow-up question: {question_text}\n\nProvide a general answer.{FOLLOWUP_INSTRUCTIONS[followup_type]}"
 
-{self.last_solution_content}
-
-User's follow-up question: {question_text}
-
-"""
-
-        # Specialized instructions based on follow-up type
-        followup_instructions = {
-            "error_fix": """Focus on identifying and fixing the specific error or issue mentioned. 
-Provide a complete solution with corrected code and a detailed explanation of what was causing the problem.
-Be precise about what changes need to be made and why they resolve the issue.""",
-            
-            "explanation": """Provide a clear, detailed explanation of the concept or aspect the user is asking about.
-Use analogies, step-by-step breakdowns, or visual descriptions if helpful.
-Make sure your explanation is accessible and tailored to help them genuinely understand the topic.""",
-            
-            "optimization": """Analyze the current solution and identify specific opportunities for optimization.
-Explain the performance implications of your suggested improvements (time/space complexity).
-Provide optimized code with comments explaining each optimization technique.
-Compare before and after performance characteristics.""",
-            
-            "alternative": """Develop a completely different approach to solving the original problem.
-Explain the key differences between this alternative and the previous solution.
-Discuss the trade-offs between the approaches (simplicity, performance, readability, etc.).
-Provide full implementation of the alternative solution.""",
-            
-            "general": """Address the user's follow-up question directly and thoroughly.
-Provide any additional code, explanations, or resources needed to fully answer their question.
-Make sure your response builds on the context of the previous solution while focusing specifically on what they're asking."""
-        }
-        
-        # Build the final prompt
-        final_prompt = base_context + followup_instructions.get(followup_type, followup_instructions["general"])
-        
-        return final_prompt
+        # Only the question is new per call; the prefix is cached and the suffix prebuilt
+        return f"{followup_context_prefix(self.last_solution_content)}{question_text}{FOLLOWUP_PROMPT_SUFFIXES[followup_type]}"
 
     def process_follow_up(self, question_text):
         """Compatibility method that calls process_followup to maintain UI compatibility"""
@@ -1,61 +1,123 @@
 import os
+from dataclasses import dataclass
+from typing import Final, Optional
 
-# --- API Configuration ---
-# Load API Key from environment variable (recommended for security)
-OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
+# --- Environment ---
+# Environment variables are read once, here, and frozen; everything else uses the values below.
+@dataclass(frozen=True)
+class EnvironmentSettings:
+    openrouter_api_key: Optional[str]
+    openrouter_referrer_url: str
+    openrouter_site_title: str
+
+def _load_environment():
+    """Read all environment-driven settings in a single pass"""
+    env = os.environ
+    return EnvironmentSettings(
+        # Load API Key from environment variable (recommended for security)
+        openrouter_api_key=env.get("OPENROUTER_API_KEY"),
+        # OpenRouter Headers (Optional)
+        # Set env vars OPENROUTER_REFERRER_URL and OPENROUTER_SITE_TITLE if you want these
+        openrouter_referrer_url=env.get("OPENROUTER_REFERRER_URL", "acecoder.dev"),
+        openrouter_site_title=env.get("OPENROUTER_SITE_TITLE", "AceCoder"),
+    )
 
-# OpenRouter Headers (Optional)
-# Set env vars OPENROUTER_REFERRER_URL and OPENROUTER_SITE_TITLE if you want these
-OPENROUTER_REFERRER_URL = os.environ.get("OPENROUTER_REFERRER_URL", "acecoder.dev")
-OPENROUTER_SITE_TITLE = os.environ.get("OPENROUTER_SITE_TITLE", "AceCoder")
+ENVIRONMENT: Final = _load_environment()
+
+# --- API Configuration ---
+# Settings are annotated Final: they are read-only after import.
+OPENROUTER_API_KEY: Final = ENVIRONMENT.openrouter_api_key
+OPENROUTER_REFERRER_URL: Final = ENVIRONMENT.openrouter_referrer_url
+OPENROUTER_SITE_TITLE: Final = ENVIRONMENT.openrouter_site_title
 
 # --- Model Configuration ---
 # You can find model identifiers at https://openrouter.ai/models
 # Ensure the models support multimodal inputs (image and text)
-DEFAULT_MODEL_NAME = "google/gemini-2.5-pro-preview-03-25"        # Main model for standard processing
-DETECTION_MODEL_NAME = "google/gemini-2.0-flash-lite-001" # Model for content detection (needs to be fast)
-FAST_MODEL_NAME = "google/gemini-2.5-pro-preview-03-25"            # Model for fast processing (skips detection)
+DEFAULT_MODEL_NAME: Final = "google/gemini-2.5-pro-preview-03-25"        # Main model for standard processing
+DETECTION_MODEL_NAME: Final = "google/gemini-2.0-flash-lite-001" # Model for content detection (needs to be fast)
+FAST_MODEL_NAME: Final = "google/gemini-2.5-pro-preview-03-25"            # Model for fast processing (skips detection)
 
 # Default content type to assume when using fast mode (skipping detection)
 # Options: "coding", "multiple_choice", "debugging", "system_design", "general"
-FAST_MODE_DEFAULT_CONTENT_TYPE = "general"
+FAST_MODE_DEFAULT_CONTENT_TYPE: Final = "general"
+
+# Classify screenshots locally with OCR keyword rules before calling the detection model.
+# Only used when pytesseract and the Tesseract binary are installed.
+LOCAL_CONTENT_DETECTION: Final = True
+
+# Start a 'general' analysis request alongside content detection (standard mode only).
+# It is reused when detection returns 'general' and cancelled otherwise, trading
+# some extra API usage for lower latency.
+SPECULATIVE_ANALYSIS: Final = True
 
 # Model Generation Parameters
-DEFAULT_TEMPERATURE = 0.1  # Lower temperature for more deterministic outputs
-DEFAULT_MAX_TOKENS = 8192  # Max tokens for the response
+DEFAULT_TEMPERATURE: Final = 0.1  # Lower temperature for more deterministic outputs
+DEFAULT_MAX_TOKENS: Final = 8192  # Max tokens for the response
 
 # API Request Settings
-DEFAULT_RETRY_COUNT = 2    # Number of retries for failed API calls
-DEFAULT_TIMEOUT = 120      # Timeout in seconds for API requests
+DEFAULT_RETRY_COUNT: Final = 2    # Number of retries for failed API calls
+DEFAULT_TIMEOUT: Final = 120      # Timeout in seconds for API requests
+
+# Streaming
+STREAM_UPDATE_INTERVAL_MS: Final = 80  # Minimum time between overlay updates while a response streams
+STREAM_UPDATE_MAX_CHUNKS: Final = 16   # Force an overlay update after this many streamed chunks
 
 # --- Application Settings ---
 # Logging
-MAX_LOG_SIZE_MB = 50       # Maximum size for log files in megabytes
+MAX_LOG_SIZE_MB: Final = 50       # Maximum size for log files in megabytes
 
 # Screenshotting
-SCREENSHOT_DELAY_MS = 100 # Delay in milliseconds before taking screenshot after hiding overlay
+SCREENSHOT_DELAY_MS: Final = 100 # Delay in milliseconds before taking screenshot after hiding overlay (only when the overlay can't be excluded from captures)
+MAX_SCREENSHOTS: Final = 16 # Captures kept for processing; the oldest is dropped beyond this
+UPLOAD_IMAGE_MAX_EDGE: Final = 1600    # Screenshots are downscaled to fit within this many pixels before upload
+UPLOAD_IMAGE_JPEG_QUALITY: Final = 85  # JPEG quality used for uploaded screenshots
 
 # Overlay Window
-OVERLAY_MOVEMENT_STEP = 50 # Pixels to move the overlay window with hotkeys
+OVERLAY_MOVEMENT_STEP: Final = 50 # Pixels to move the overlay window with hotkeys
+OUTPUT_RENDER_INTERVAL_MS: Final = 50 # Output updates arriving closer together than this are rendered once
+FOLLOW_UP_REPEAT_WINDOW_S: Final = 60 # A follow-up repeated within this many seconds reuses the previous response
 
 # --- Hotkeys ---
 # Format: Use lowercase letters. Modifiers: ctrl, shift, alt, cmd (macOS only for cmd)
 # Examples: 'ctrl+shift+h', 'alt+enter'
-# Note: Key names might vary slightly between Windows ('enter') and macOS ('<enter>') for pynput.
-# The HotkeyHandler in main.py attempts to normalize common differences.
-HOTKEY_CAPTURE = 'ctrl+shift+h'
-HOTKEY_PROCESS = 'ctrl+shift+enter'
-HOTKEY_PROCESS_FAST = 'alt+shift+enter' # New hotkey for fast mode
-HOTKEY_TOGGLE_VISIBILITY = 'ctrl+b'
-HOTKEY_MOVE_LEFT = 'ctrl+alt+left'
-HOTKEY_MOVE_RIGHT = 'ctrl+alt+right'
-HOTKEY_MOVE_UP = 'ctrl+alt+up'
-HOTKEY_MOVE_DOWN = 'ctrl+alt+down'
-HOTKEY_TOGGLE_CAPTURE_VISIBILITY = 'ctrl+shift+v'
-HOTKEY_RESET_SCREENSHOTS = 'ctrl+shift+r'
-HOTKEY_FOLLOW_UP = 'ctrl+l'
-HOTKEY_FOCUS_OVERLAY = 'ctrl+shift+l'
+# Note: Key names differ between Windows ('enter') and macOS ('<enter>') for pynput;
+# PYNPUT_HOTKEYS below holds the converted form used by the HotkeyHandler in main.py.
+HOTKEY_CAPTURE: Final = 'ctrl+shift+h'
+HOTKEY_PROCESS: Final = 'ctrl+shift+enter'
+HOTKEY_PROCESS_FAST: Final = 'alt+shift+enter' # New hotkey for fast mode
+HOTKEY_TOGGLE_VISIBILITY: Final = 'ctrl+b'
+HOTKEY_MOVE_LEFT: Final = 'ctrl+alt+left'
+HOTKEY_MOVE_RIGHT: Final = 'ctrl+alt+right'
+HOTKEY_MOVE_UP: Final = 'ctrl+alt+up'
+HOTKEY_MOVE_DOWN: Final = 'ctrl+alt+down'
+HOTKEY_TOGGLE_CAPTURE_VISIBILITY: Final = 'ctrl+shift+v'
+HOTKEY_RESET_SCREENSHOTS: Final = 'ctrl+shift+r'
+HOTKEY_FOLLOW_UP: Final = 'ctrl+l'
+HOTKEY_FOCUS_OVERLAY: Final = 'ctrl+shift+l'
+
+# Hotkeys by action name, in registration order
+HOTKEYS: Final = {
+    "capture": HOTKEY_CAPTURE,
+    "process": HOTKEY_PROCESS,
+    "process_fast": HOTKEY_PROCESS_FAST,
+    "toggle_visibility": HOTKEY_TOGGLE_VISIBILITY,
+    "move_left": HOTKEY_MOVE_LEFT,
+    "move_right": HOTKEY_MOVE_RIGHT,
+    "move_up": HOTKEY_MOVE_UP,
+    "move_down": HOTKEY_MOVE_DOWN,
+    "toggle_capture_visibility": HOTKEY_TOGGLE_CAPTURE_VISIBILITY,
+    "reset_screenshots": HOTKEY_RESET_SCREENSHOTS,
+    "follow_up": HOTKEY_FOLLOW_UP,
+    "focus_overlay": HOTKEY_FOCUS_OVERLAY,
+}
+
+def _to_pynput_hotkey(hotkey):
+    """Convert 'ctrl+shift+enter' to pynput's '<ctrl>+<shift>+<enter>' format"""
+    return "+".join(key if len(key) == 1 else f"<{key}>" for key in hotkey.lower().split("+"))
+
+# Converted once at import for the pynput listener (macOS)
+PYNPUT_HOTKEYS: Final = {name: _to_pynput_hotkey(hotkey) for name, hotkey in HOTKEYS.items()}
 
 # --- Mock Mode ---
 # Set to True to simulate API responses without actual calls (for testing UI)
-MOCK_MODE = False 
\ No newline at end of file
+MOCK_MODE: Final = False 
\ No newline at end of file
@@ -0,0 +1 @@
+# Makes the application modules at the repository root importable from tests/
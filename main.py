@@ -1,15 +1,21 @@
 import sys
 import signal
+import socket
 import time
+import atexit
+import ctypes
+import hashlib
+import queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
 # Conditionally import keyboard or pynput
 if sys.platform == 'win32':
+    # Hotkeys are registered with the Win32 RegisterHotKey API; the 'keyboard' library
+    # is only used for combinations that another application has already claimed
     try:
         import keyboard
     except ImportError:
-        print("Error: keyboard library not found. Please install it using:")
-        print("pip install keyboard")
-        sys.exit(1)
+        keyboard = None
 elif sys.platform == 'darwin':
     try:
         from pynput import keyboard as pynput_keyboard
@@ -23,17 +29,16 @@ else:
     pynput_keyboard = None # Ensure the variable exists
     keyboard = None
 
-from io import BytesIO
 from PIL import Image
 import threading
-from functools import partial
+from collections import deque
 import os
 from datetime import datetime
 from PySide6.QtWidgets import QApplication, QMessageBox
-from PySide6.QtCore import QTimer, QObject, Signal, Slot, Qt
+from PySide6.QtCore import QAbstractNativeEventFilter, QCoreApplication, QTimer, QObject, QRunnable, QSocketNotifier, QThreadPool, Signal, Slot, Qt
 
 from overlay import OverlayWindow
-from api_client import ApiClient  # Import our new ApiClient instead of BackendClient
+from api_client import ApiClient, encode_jpeg  # Import our new ApiClient instead of BackendClient
 import config # Import the configuration file
 
 # Add necessary imports
@@ -56,22 +61,36 @@ if sys.platform == 'darwin':
     except ImportError:
         print("Error: PyObjC not installed. Please run: pip install pyobjc-framework-cocoa")
         sys.exit(1)
+    try:
+        import Quartz
+    except ImportError:
+        Quartz = None # Screenshots fall back to the screencapture utility
 
 # --- High DPI Scaling --- (Set BEFORE QApplication import)
 # Enable High DPI scaling for better rendering on scaled displays
 os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "1"
-os.environ["QT_SCALE_FACTOR"] = "1.25" # Start with 1, adjust if needed
 # ----------------------
 
 # Set up logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(os.path.dirname(__file__), 'cognicoder.log'))
-    ]
-)
+# Records are queued by the logging thread and written by a background listener,
+# so the UI, hotkey and capture threads never block on console or disk I/O
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_handlers = [
+    logging.StreamHandler(),
+    logging.FileHandler(os.path.join(os.path.dirname(__file__), 'cognicoder.log'))
+]
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+# Only merge the message (and any traceback) here; the listener's handlers add the prefix
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+# force: modules imported above may already have configured the root logger, which
+# would otherwise make this call a silent no-op and leave logging synchronous
+logging.basicConfig(level=logging.DEBUG, handlers=[queue_handler], force=True)
+log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop) # Flush queued records before logging shuts down
 logger = logging.getLogger(__name__)
 
 # Disable third-party loggers
@@ -87,9 +106,24 @@ MOCK_MODE = config.MOCK_MODE # Use config value
 # API_BASE_URL = "http://localhost:5000" # No longer needed, handled in ApiClient
 
 # Constants for screenshot capture
-SCREENSHOT_DELAY_MS = config.SCREENSHOT_DELAY_MS # Use config value
 MOVEMENT_STEP = config.OVERLAY_MOVEMENT_STEP  # Use config value
-# DELAY_SECONDS = 0.5 # Delay for screenshot - replaced by SCREENSHOT_DELAY_MS
+# Presses of these hotkeys closer together than this (seconds) are ignored, so a
+# double-tap or key auto-repeat doesn't capture twice or restart an analysis
+HOTKEY_MIN_INTERVALS = {"capture": 0.25, "process": 0.5}
+MOVE_COALESCE_MS = 16 # Overlay moves from key auto-repeat are applied at most once per frame (~60 Hz)
+
+QOS_CLASS_USER_INTERACTIVE = 0x21 # From <sys/qos.h>
+
+def set_interactive_thread_qos():
+    """Give the calling thread user-interactive QoS (macOS), so the scheduler runs it
+    ahead of capture and network work and hotkeys stay responsive under load."""
+    try:
+        libpthread = ctypes.CDLL("/usr/lib/system/libsystem_pthread.dylib")
+        result = libpthread.pthread_set_qos_class_self_np(ctypes.c_uint(QOS_CLASS_USER_INTERACTIVE), ctypes.c_int(0))
+        if result != 0:
+            logger.warning(f"pthread_set_qos_class_self_np failed with error {result}")
+    except (OSError, AttributeError) as e:
+        logger.warning(f"Could not raise hotkey listener thread QoS: {e}")
 
 class SignalHandler(QObject):
     def __init__(self, app):
@@ -100,16 +134,58 @@ class SignalHandler(QObject):
         logger.info(f"Signal {signum} received, shutting down...")
         self.app.quit()
 
+# --- Windows hotkeys (RegisterHotKey) ---
+WM_HOTKEY = 0x0312
+WINDOWS_MODIFIERS = {"alt": 0x0001, "ctrl": 0x0002, "shift": 0x0004, "win": 0x0008}
+MOD_NOREPEAT = 0x4000 # Windows drops the auto-repeats of a held hotkey instead of posting WM_HOTKEY for each
+# Hotkeys that act on auto-repeat while held (overlay moves); all others are registered with MOD_NOREPEAT
+REPEATING_HOTKEYS = frozenset({"move_left", "move_right", "move_up", "move_down"})
+WINDOWS_VIRTUAL_KEYS = {
+    "enter": 0x0D, "tab": 0x09, "space": 0x20, "esc": 0x1B, "backspace": 0x08,
+    "left": 0x25, "up": 0x26, "right": 0x27, "down": 0x28,
+    **{f"f{n}": 0x6F + n for n in range(1, 13)},
+}
+if sys.platform == 'win32':
+    import ctypes.wintypes
+    user32 = ctypes.windll.user32
+
+def parse_windows_hotkey(hotkey):
+    """Convert 'ctrl+shift+h' into RegisterHotKey (modifiers, virtual key); the key is None if unknown"""
+    modifiers, vk = 0, None
+    for key in hotkey.lower().split("+"):
+        if key in WINDOWS_MODIFIERS:
+            modifiers |= WINDOWS_MODIFIERS[key]
+        elif len(key) == 1 and key.isalnum():
+            vk = ord(key.upper()) # Letter and digit virtual-key codes match their ASCII capitals
+        else:
+            vk = WINDOWS_VIRTUAL_KEYS.get(key)
+    return modifiers, vk
+
+class WindowsHotkeyFilter(QAbstractNativeEventFilter):
+    """Dispatches WM_HOTKEY messages from RegisterHotKey to the matching callback (Windows)"""
+
+    def __init__(self):
+        super().__init__()
+        self.callbacks = {} # hotkey id -> callback
+
+    def nativeEventFilter(self, event_type, message):
+        # Thread-level WM_HOTKEY messages arrive through the event dispatcher
+        if event_type.data() in (b"windows_dispatcher_MSG", b"windows_generic_MSG"):
+            msg = ctypes.wintypes.MSG.from_address(int(message))
+            if msg.message == WM_HOTKEY:
+                callback = self.callbacks.get(msg.wParam)
+                if callback:
+                    callback()
+                    return True, 0
+        return False, 0
+
 # Global hotkey handler using platform-specific library
 class HotkeyHandler(QObject):
     capture_signal = Signal()
     toggle_signal = Signal()
     process_signal = Signal()
     process_fast_signal = Signal() # New signal for fast processing
-    move_left_signal = Signal()
-    move_right_signal = Signal()
-    move_up_signal = Signal()
-    move_down_signal = Signal()
+    move_signal = Signal(int, int) # (dx, dy) offset for the overlay
     toggle_capture_visibility_signal = Signal()
     reset_screenshots_signal = Signal()
     follow_up_signal = Signal()
@@ -119,97 +195,107 @@ class HotkeyHandler(QObject):
         super().__init__()
         # pynput specific attributes, initialize only if needed
         self.listener = None
-        self.listener_thread = None
+        self._last_press = {} # Hotkey name -> time.monotonic() of the last press acted on
+        # Windows specific attributes
+        self._native_filter = None
+        self._registered_hotkey_ids = []
+        self._keyboard_hooked = False
+
+    def _hotkey_callbacks(self):
+        """Map each hotkey name in config.HOTKEYS to the method that handles it"""
+        return {
+            "capture": self.on_capture,
+            "process": self.on_process,
+            "process_fast": self.on_process_fast,
+            "toggle_visibility": self.on_toggle,
+            "move_left": self.on_move_left,
+            "move_right": self.on_move_right,
+            "move_up": self.on_move_up,
+            "move_down": self.on_move_down,
+            "toggle_capture_visibility": self.toggle_capture_visibility,
+            "reset_screenshots": self.on_reset_screenshots,
+            "follow_up": self.on_follow_up,
+            "focus_overlay": self.on_focus,
+        }
 
     def start_listener(self):
         """Starts the appropriate hotkey listener based on the OS."""
-        if sys.platform == 'win32' and keyboard:
-            logger.debug("Registering hotkeys using 'keyboard' library (Windows)...")
-            # Register hotkeys using keyboard library and config values
-            # Use suppress=True to prevent the key press from propagating
-            keyboard.add_hotkey(config.HOTKEY_CAPTURE, self.on_capture, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_PROCESS, self.on_process, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_PROCESS_FAST, self.on_process_fast, suppress=True) # Register fast process hotkey
-            keyboard.add_hotkey(config.HOTKEY_TOGGLE_VISIBILITY, self.on_toggle, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_MOVE_LEFT, self.on_move_left, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_MOVE_RIGHT, self.on_move_right, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_MOVE_UP, self.on_move_up, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_MOVE_DOWN, self.on_move_down, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_TOGGLE_CAPTURE_VISIBILITY, self.toggle_capture_visibility, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_RESET_SCREENSHOTS, self.on_reset_screenshots, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_FOLLOW_UP, self.on_follow_up, suppress=True)
-            keyboard.add_hotkey(config.HOTKEY_FOCUS_OVERLAY, self.on_focus, suppress=True)
-            logger.info("'keyboard' hotkeys registered.")
-            # Note: 'keyboard' library doesn't require a separate listener thread typically.
-            # It hooks into the system event loop.
+        if sys.platform == 'win32':
+            logger.debug("Registering hotkeys with RegisterHotKey (Windows)...")
+            # The OS delivers WM_HOTKEY to this (the UI) thread's message queue, where the
+            # native event filter picks it up; no keystroke hook or listener thread is needed
+            callbacks = self._hotkey_callbacks()
+            self._native_filter = WindowsHotkeyFilter()
+            QCoreApplication.instance().installNativeEventFilter(self._native_filter)
+            for hotkey_id, (name, hotkey) in enumerate(config.HOTKEYS.items(), start=1):
+                modifiers, vk = parse_windows_hotkey(hotkey)
+                if name not in REPEATING_HOTKEYS:
+                    modifiers |= MOD_NOREPEAT
+                if vk is not None and user32.RegisterHotKey(None, hotkey_id, modifiers, vk):
+                    self._native_filter.callbacks[hotkey_id] = callbacks[name]
+                    self._registered_hotkey_ids.append(hotkey_id)
+                elif keyboard:
+                    # Already taken by another application (or an unknown key name)
+                    logger.warning(f"RegisterHotKey failed for '{hotkey}', falling back to the 'keyboard' library")
+                    keyboard.add_hotkey(hotkey, callbacks[name], suppress=True)
+                    self._keyboard_hooked = True
+                else:
+                    logger.error(f"Could not register hotkey '{hotkey}' (install 'keyboard' for a fallback)")
+            logger.info(f"{len(self._registered_hotkey_ids)} hotkeys registered with RegisterHotKey.")
 
         elif sys.platform == 'darwin' and pynput_keyboard:
             logger.debug("Starting pynput hotkey listener (macOS)...")
-            # Define hotkeys map for pynput using config values
-            # Note: pynput uses '<modifier>+<key>' format
-            def format_pynput_hotkey(hotkey_str):
-                # Basic replacement for common keys, might need expansion
-                return hotkey_str.replace('enter', '<enter>') \
-                                .replace('left', '<left>') \
-                                .replace('right', '<right>') \
-                                .replace('up', '<up>') \
-                                .replace('down', '<down>')
-
-            hotkeys_map = {
-                format_pynput_hotkey(config.HOTKEY_CAPTURE): self.on_capture,
-                format_pynput_hotkey(config.HOTKEY_PROCESS): self.on_process,
-                format_pynput_hotkey(config.HOTKEY_PROCESS_FAST): self.on_process_fast,
-                format_pynput_hotkey(config.HOTKEY_TOGGLE_VISIBILITY): self.on_toggle,
-                format_pynput_hotkey(config.HOTKEY_MOVE_LEFT): self.on_move_left,
-                format_pynput_hotkey(config.HOTKEY_MOVE_RIGHT): self.on_move_right,
-                format_pynput_hotkey(config.HOTKEY_MOVE_UP): self.on_move_up,
-                format_pynput_hotkey(config.HOTKEY_MOVE_DOWN): self.on_move_down,
-                format_pynput_hotkey(config.HOTKEY_TOGGLE_CAPTURE_VISIBILITY): self.toggle_capture_visibility,
-                format_pynput_hotkey(config.HOTKEY_RESET_SCREENSHOTS): self.on_reset_screenshots,
-                format_pynput_hotkey(config.HOTKEY_FOLLOW_UP): self.on_follow_up,
-                format_pynput_hotkey(config.HOTKEY_FOCUS_OVERLAY): self.on_focus
-            }
-
-            # Run listener in a separate thread for pynput
-            def run_listener():
-                try:
-                    self.listener = pynput_keyboard.GlobalHotKeys(hotkeys_map)
-                    self.listener.start() # Use start() for non-blocking
-                    logger.info("pynput GlobalHotKeys listener started.")
-                    self.listener.join() # Block this thread until listener stops
-                    logger.info("pynput GlobalHotKeys listener stopped.")
-                except Exception as e:
-                    logger.error(f"Failed to start or run pynput listener: {e}", exc_info=True)
+            # Hotkeys are converted to pynput's '<modifier>+<key>' format once, in config.py
+            callbacks = self._hotkey_callbacks()
+            hotkeys_map = {config.PYNPUT_HOTKEYS[name]: callback for name, callback in callbacks.items()}
+
+            class InteractiveGlobalHotKeys(pynput_keyboard.GlobalHotKeys):
+                def run(self):
+                    # Mark the event tap thread as user-interactive before it starts listening
+                    set_interactive_thread_qos()
+                    super().run()
 
-            self.listener_thread = threading.Thread(target=run_listener, daemon=True)
-            self.listener_thread.start()
+            # GlobalHotKeys is itself a daemon thread, so it is started directly
+            try:
+                self.listener = InteractiveGlobalHotKeys(hotkeys_map)
+                self.listener.start() # Use start() for non-blocking
+                logger.info("pynput GlobalHotKeys listener started.")
+            except Exception as e:
+                logger.error(f"Failed to start pynput listener: {e}", exc_info=True)
+                self.listener = None
 
         else:
             logger.warning(f"Hotkey listener not started (unsupported platform '{sys.platform}' or library missing).")
 
     def stop_listener(self):
         """Stops the appropriate hotkey listener based on the OS."""
-        if sys.platform == 'win32' and keyboard:
-            logger.info("Unhooking all 'keyboard' hotkeys...")
-            try:
-                keyboard.unhook_all()
-                logger.info("'keyboard' hotkeys unhooked.")
-            except Exception as e:
-                 logger.error(f"Error unhooking 'keyboard' hotkeys: {e}", exc_info=True)
+        if sys.platform == 'win32':
+            logger.info("Unregistering hotkeys...")
+            for hotkey_id in self._registered_hotkey_ids:
+                user32.UnregisterHotKey(None, hotkey_id)
+            self._registered_hotkey_ids.clear()
+            if self._native_filter is not None:
+                QCoreApplication.instance().removeNativeEventFilter(self._native_filter)
+                self._native_filter = None
+            if self._keyboard_hooked:
+                try:
+                    keyboard.unhook_all()
+                    logger.info("'keyboard' hotkeys unhooked.")
+                except Exception as e:
+                     logger.error(f"Error unhooking 'keyboard' hotkeys: {e}", exc_info=True)
+                self._keyboard_hooked = False
 
         elif sys.platform == 'darwin' and pynput_keyboard:
             if self.listener:
                 logger.info("Stopping pynput hotkey listener...")
                 try:
                     self.listener.stop()
-                    if self.listener_thread and self.listener_thread.is_alive():
-                        self.listener_thread.join(timeout=1.0)
-                        if self.listener_thread.is_alive():
-                            logger.warning("pynput listener thread did not exit cleanly.")
+                    self.listener.join(timeout=1.0)
+                    if self.listener.is_alive():
+                        logger.warning("pynput listener thread did not exit cleanly.")
                 except Exception as e:
                     logger.error(f"Error stopping pynput listener: {e}", exc_info=True)
                 self.listener = None
-                self.listener_thread = None
                 logger.info("pynput listener stopped.")
             else:
                 logger.debug("pynput listener was not running.")
@@ -217,8 +303,19 @@ class HotkeyHandler(QObject):
              logger.debug("No active hotkey listener to stop for this platform.")
 
     # --- Signal emitting methods ---
+    def _is_repeat_press(self, name):
+        """True if this hotkey already fired within its HOTKEY_MIN_INTERVALS window"""
+        now = time.monotonic()
+        if now - self._last_press.get(name, float("-inf")) < HOTKEY_MIN_INTERVALS[name]:
+            logger.debug("Ignoring repeated '%s' hotkey press", name)
+            return True
+        self._last_press[name] = now
+        return False
+
     def on_capture(self):
         logger.debug("Capture hotkey pressed: <ctrl>+<shift>+h")
+        if self._is_repeat_press("capture"):
+            return
         self.capture_signal.emit()
 
     def on_toggle(self):
@@ -226,203 +323,252 @@ class HotkeyHandler(QObject):
         self.toggle_signal.emit()
 
     def on_process(self):
-        logger.debug(f"Process hotkey pressed: {config.HOTKEY_PROCESS}")
+        logger.debug("Process hotkey pressed: %s", config.HOTKEY_PROCESS)
+        if self._is_repeat_press("process"):
+            return
         self.process_signal.emit()
 
     def on_process_fast(self):
-        logger.debug(f"Process Fast hotkey pressed: {config.HOTKEY_PROCESS_FAST}")
+        logger.debug("Process Fast hotkey pressed: %s", config.HOTKEY_PROCESS_FAST)
+        if self._is_repeat_press("process"): # Shares the window with standard processing
+            return
         self.process_fast_signal.emit() # Emit the new signal
 
     def on_move_left(self):
-        logger.debug(f"Move left hotkey pressed: {config.HOTKEY_MOVE_LEFT}")
-        self.move_left_signal.emit()
+        logger.debug("Move left hotkey pressed: %s", config.HOTKEY_MOVE_LEFT)
+        self.move_signal.emit(-MOVEMENT_STEP, 0)
 
     def on_move_right(self):
-        logger.debug(f"Move right hotkey pressed: {config.HOTKEY_MOVE_RIGHT}")
-        self.move_right_signal.emit()
+        logger.debug("Move right hotkey pressed: %s", config.HOTKEY_MOVE_RIGHT)
+        self.move_signal.emit(MOVEMENT_STEP, 0)
 
     def on_move_up(self):
-        logger.debug(f"Move up hotkey pressed: {config.HOTKEY_MOVE_UP}")
-        self.move_up_signal.emit()
+        logger.debug("Move up hotkey pressed: %s", config.HOTKEY_MOVE_UP)
+        self.move_signal.emit(0, -MOVEMENT_STEP)
 
     def on_move_down(self):
-        logger.debug(f"Move down hotkey pressed: {config.HOTKEY_MOVE_DOWN}")
-        self.move_down_signal.emit()
+        logger.debug("Move down hotkey pressed: %s", config.HOTKEY_MOVE_DOWN)
+        self.move_signal.emit(0, MOVEMENT_STEP)
 
     def toggle_capture_visibility(self):
-        logger.debug(f"Toggle capture visibility hotkey pressed: {config.HOTKEY_TOGGLE_CAPTURE_VISIBILITY}")
+        logger.debug("Toggle capture visibility hotkey pressed: %s", config.HOTKEY_TOGGLE_CAPTURE_VISIBILITY)
         self.toggle_capture_visibility_signal.emit()
 
     def on_reset_screenshots(self):
-        logger.debug(f"Reset screenshots hotkey pressed: {config.HOTKEY_RESET_SCREENSHOTS}")
+        logger.debug("Reset screenshots hotkey pressed: %s", config.HOTKEY_RESET_SCREENSHOTS)
         self.reset_screenshots_signal.emit()
 
     def on_follow_up(self):
-        logger.debug(f"Follow-up hotkey pressed: {config.HOTKEY_FOLLOW_UP}")
+        logger.debug("Follow-up hotkey pressed: %s", config.HOTKEY_FOLLOW_UP)
         self.follow_up_signal.emit()
 
     def on_focus(self):
-        logger.debug(f"Focus overlay hotkey pressed: {config.HOTKEY_FOCUS_OVERLAY}")
+        logger.debug("Focus overlay hotkey pressed: %s", config.HOTKEY_FOCUS_OVERLAY)
         self.focus_signal.emit()
 
 # Screenshot and navigation functions
-def take_screenshot(overlay):
-    """Hides overlay and triggers delayed capture."""
-    logger.debug("Initiating screenshot capture")
-    # Hide overlay first
-    #overlay.hide()
-
-    # Schedule the actual screenshot after a delay to ensure overlay is hidden
-    QTimer.singleShot(config.SCREENSHOT_DELAY_MS, partial(delayed_capture, overlay))
-
-def delayed_capture(overlay):
-    """Performs the actual screen capture using platform-specific methods."""
-    logger.debug("Delayed capture executing")
-    image_bytes = None
-    try:
-        if sys.platform == 'darwin':
-            # macOS implementation using screencapture utility
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_file:
-                tmp_filename = tmp_file.name
-            logger.debug(f"Using temporary file for screenshot: {tmp_filename}")
-
-            # Command: screencapture -x (no sound, no cursor) <filename>
-            command = ["screencapture", "-x", tmp_filename]
-
+def downscale_frame(img):
+    """Shrink a captured frame in place to fit within the upload size limit"""
+    # Only this many pixels are ever uploaded, so there is no point storing more
+    max_edge = config.UPLOAD_IMAGE_MAX_EDGE
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return img
+
+def capture_main_display():
+    """Capture the main display in-process with CoreGraphics (macOS)"""
+    cg_image = Quartz.CGDisplayCreateImage(Quartz.CGMainDisplayID())
+    if cg_image is None:
+        # No image usually means the Screen Recording permission has not been granted
+        raise RuntimeError("CGDisplayCreateImage returned no image")
+    width = Quartz.CGImageGetWidth(cg_image)
+    height = Quartz.CGImageGetHeight(cg_image)
+    bytes_per_row = Quartz.CGImageGetBytesPerRow(cg_image)
+    pixels = Quartz.CGDataProviderCopyData(Quartz.CGImageGetDataProvider(cg_image))
+    # Display images are 32-bit BGRA; rows may be padded beyond width * 4
+    return Image.frombuffer("RGB", (width, height), bytes(pixels), "raw", "BGRX", bytes_per_row, 1)
+
+# Capture threads are kept alive for the whole session, so each keeps its mss instance
+# (and the GDI handles behind it) instead of setting one up per screenshot
+CAPTURE_THREADS = 2
+_capture_pool = None
+_screen_grabbers = threading.local()
+_open_screen_grabbers = []
+_screen_grabbers_lock = threading.Lock()
+_display_generation = 0 # Bumped when screens change; grabbers from older generations are replaced
+
+def get_capture_pool():
+    """Return the thread pool that runs CaptureTasks, creating it on first use"""
+    global _capture_pool
+    if _capture_pool is None:
+        _capture_pool = QThreadPool()
+        _capture_pool.setMaxThreadCount(CAPTURE_THREADS)
+        _capture_pool.setExpiryTimeout(-1) # Never retire threads, so their grabbers stay valid
+    return _capture_pool
+
+def get_screen_grabber():
+    """Return the calling thread's mss instance (Windows), creating it on first use.
+
+    mss enumerates the monitors once per instance and caches them, so the instance is
+    replaced after the display configuration changes (see invalidate_screen_grabbers).
+    """
+    sct = getattr(_screen_grabbers, "sct", None)
+    if sct is not None and _screen_grabbers.generation != _display_generation:
+        with _screen_grabbers_lock:
+            if sct in _open_screen_grabbers:
+                _open_screen_grabbers.remove(sct)
+        sct.close()
+        sct = None
+    if sct is None:
+        # mss instances hold per-thread device contexts, so each capture thread gets its own
+        sct = _screen_grabbers.sct = mss.mss()
+        _screen_grabbers.generation = _display_generation
+        with _screen_grabbers_lock:
+            _open_screen_grabbers.append(sct)
+    return sct
+
+def invalidate_screen_grabbers(*_):
+    """Make capture threads re-enumerate monitors on their next grab (display added/removed)"""
+    global _display_generation
+    _display_generation += 1
+    logger.debug("Display configuration changed, screen grabbers will refresh monitors")
+
+def close_screen_grabbers():
+    """Close every mss instance opened by the capture threads"""
+    if _capture_pool is not None:
+        _capture_pool.waitForDone(1000) # Let an in-flight capture finish with its grabber
+    with _screen_grabbers_lock:
+        while _open_screen_grabbers:
             try:
-                # Run the command
-                result = subprocess.run(command, check=True, capture_output=True, text=True, timeout=10)
-                logger.debug(f"screencapture command executed successfully.")
-                # Optional: Check result.stderr for potential warnings, though usually empty on success
-                if result.stderr:
-                    logger.warning(f"screencapture stderr: {result.stderr.strip()}")
-
-                # Read the captured image file using PIL
-                with Image.open(tmp_filename) as img:
-                    logger.debug(f"Screenshot opened from {tmp_filename} (mode: {img.mode}, size: {img.size})")
-                    # Convert to RGB if it has alpha (PNGs often do)
-                    if img.mode == 'RGBA':
-                        logger.debug("Converting image from RGBA to RGB")
-                        img = img.convert('RGB')
-
-                    # Save to BytesIO buffer as WEBP
-                    buffer = BytesIO()
-                    img.save(buffer, format="WEBP", quality=70)
-                    image_bytes = buffer.getvalue()
-                    logger.debug(f"Screenshot saved to buffer as WEBP (size: {len(image_bytes)} bytes)")
-
-            except FileNotFoundError:
-                 logger.error("Error: 'screencapture' command not found. Ensure macOS is running and the command is in PATH.")
-                 overlay.update_status("Error: screencapture command not found.")
-                 return # Stop processing this screenshot attempt
-            except subprocess.CalledProcessError as e:
-                # Log error details from the failed command
-                logger.error(f"screencapture command failed with return code {e.returncode}")
-                if e.stdout:
-                    logger.error(f"stdout: {e.stdout.strip()}")
-                if e.stderr:
-                    logger.error(f"stderr: {e.stderr.strip()}")
-                overlay.update_status(f"Screenshot failed (screencapture error {e.returncode}).")
-                return # Stop processing this screenshot attempt
-            except subprocess.TimeoutExpired:
-                logger.error("screencapture command timed out after 10 seconds.")
-                overlay.update_status("Screenshot failed (timeout).")
-                return # Stop processing this screenshot attempt
+                _open_screen_grabbers.pop().close()
             except Exception as e:
-                 logger.error(f"Error processing screenshot file {tmp_filename}: {e}", exc_info=True)
-                 overlay.update_status(f"Error reading screenshot: {e}")
-                 return # Stop processing this screenshot attempt
-            finally:
-                # Clean up the temporary file regardless of success/failure reading it
-                if os.path.exists(tmp_filename):
-                    try:
-                        os.remove(tmp_filename)
-                        logger.debug(f"Removed temporary file: {tmp_filename}")
-                    except OSError as e:
-                        logger.warning(f"Could not remove temporary screenshot file {tmp_filename}: {e}")
-
-        elif sys.platform == 'win32':
-            logger.debug("Delayed capture executing")
-            try:
-                # Take screenshot
-                with mss.mss() as sct:
-                    monitor = sct.monitors[1]
-                    screenshot = sct.grab(monitor)
+                logger.warning(f"Error closing screen grabber: {e}")
+
+class CaptureError(Exception):
+    """Screenshot failure carrying the message to show in the overlay status"""
 
-                    # Convert to PIL Image
-                    img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
+def capture_with_screencapture():
+    """Capture the screen with the macOS screencapture utility and return it as a PIL image."""
+    # macOS implementation using screencapture utility
+    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_file:
+        tmp_filename = tmp_file.name
+    logger.debug("Using temporary file for screenshot: %s", tmp_filename)
 
-                    # Store screenshot
-                    buffer = BytesIO()
-                    img.save(buffer, format="WEBP", quality=70)  # Changed from JPEG to WebP with quality 70
-                    image_bytes = buffer.getvalue()
+    # Command: screencapture -x (no sound, no cursor) <filename>
+    command = ["screencapture", "-x", tmp_filename]
 
-                    # Store in app global
-                    #QApplication.instance().screenshots.append(image_bytes)
+    try:
+        # Run the command
+        result = subprocess.run(command, check=True, capture_output=True, text=True, timeout=10)
+        logger.debug("screencapture command executed successfully.")
+        # Optional: Check result.stderr for potential warnings, though usually empty on success
+        if result.stderr:
+            logger.warning(f"screencapture stderr: {result.stderr.strip()}")
+
+        # Read the captured image file using PIL
+        with Image.open(tmp_filename) as img:
+            logger.debug("Screenshot opened from %s (mode: %s, size: %s)", tmp_filename, img.mode, img.size)
+            # Convert to RGB (PNGs often have alpha); this also copies the pixels out of the file
+            return img.convert('RGB')
+
+    except FileNotFoundError:
+        logger.error("Error: 'screencapture' command not found. Ensure macOS is running and the command is in PATH.")
+        raise CaptureError("Error: screencapture command not found.")
+    except subprocess.CalledProcessError as e:
+        # Log error details from the failed command
+        logger.error(f"screencapture command failed with return code {e.returncode}")
+        if e.stdout:
+            logger.error(f"stdout: {e.stdout.strip()}")
+        if e.stderr:
+            logger.error(f"stderr: {e.stderr.strip()}")
+        raise CaptureError(f"Screenshot failed (screencapture error {e.returncode}).")
+    except subprocess.TimeoutExpired:
+        logger.error("screencapture command timed out after 10 seconds.")
+        raise CaptureError("Screenshot failed (timeout).")
+    except Exception as e:
+        logger.error(f"Error processing screenshot file {tmp_filename}: {e}", exc_info=True)
+        raise CaptureError(f"Error reading screenshot: {e}")
+    finally:
+        # Clean up the temporary file regardless of success/failure reading it
+        if os.path.exists(tmp_filename):
+            try:
+                os.remove(tmp_filename)
+                logger.debug("Removed temporary file: %s", tmp_filename)
+            except OSError as e:
+                logger.warning(f"Could not remove temporary screenshot file {tmp_filename}: {e}")
 
-                    # Update status
-                    overlay.update_status(f"Screenshot {len(QApplication.instance().screenshots)} captured. Press CTRL+SHIFT+ENTER to process.")
+def capture_screenshot():
+    """Performs the actual screen capture using platform-specific methods and returns a PIL image.
 
-                    # Show overlay again
-                    overlay.show()
+    Runs on a thread pool worker (see CaptureTask), so it must not touch any widgets.
+    Frames are kept unencoded; ApiClient encodes them for upload when they are processed.
+    """
+    if sys.platform == 'darwin':
+        if Quartz is not None:
+            try:
+                img = capture_main_display()
+                logger.debug("Screenshot captured with CoreGraphics (size: %s)", img.size)
+                return img
             except Exception as e:
-                logger.error(f"Screenshot error: {e}")
-                overlay.update_status(f"Screenshot error: {e}")
-                overlay.show()
+                logger.warning(f"CoreGraphics capture failed, falling back to screencapture: {e}")
+        return capture_with_screencapture()
 
-        else:
-             logger.warning(f"Screenshot functionality not supported on platform: {sys.platform}")
-             overlay.update_status(f"Screenshot not supported on this OS ({sys.platform}).")
-             return # Stop processing
-
-        # If we got image_bytes, store it
-        if image_bytes:
-            app_instance = QApplication.instance()
-            if not hasattr(app_instance, 'screenshots'):
-                app_instance.screenshots = [] # Initialize if somehow missing
-            app_instance.screenshots.append(image_bytes)
-            screenshot_count = len(app_instance.screenshots)
-            overlay.update_status(f"Screenshot {screenshot_count} captured. Press CTRL+SHIFT+ENTER to process.")
-            logger.info(f"Screenshot {screenshot_count} captured and stored.")
-        else:
-            # This case should ideally be covered by the returns above, but as a fallback:
-            logger.warning("Screenshot capture resulted in no image data.")
-            overlay.update_status("Screenshot capture failed to produce image.")
+    elif sys.platform == 'win32':
+        try:
+            # Take screenshot
+            sct = get_screen_grabber()
+            monitor = sct.monitors[1]
+            screenshot = sct.grab(monitor)
 
-    except Exception as e:
-        # General error catching for the whole function
-        logger.error(f"Unexpected error during delayed_capture: {e}", exc_info=True)
-        overlay.update_status(f"Screenshot error: {e}")
-    finally:
-        # Ensure overlay is shown again, even if errors occurred
-        if not overlay.isVisible():
-             logger.debug("Showing overlay after capture attempt.")
-             overlay.show()
+            # Convert to PIL Image straight from mss's buffer (.bgra would copy it first)
+            return Image.frombytes("RGB", screenshot.size, screenshot.raw, "raw", "BGRX")
+        except Exception as e:
+            logger.error(f"Screenshot error: {e}")
+            raise CaptureError(f"Screenshot error: {e}")
 
-def process_screenshots(overlay, fast_mode=False):
-    """Initiates screenshot processing via ApiClient.
+    else:
+        logger.warning(f"Screenshot functionality not supported on platform: {sys.platform}")
+        raise CaptureError(f"Screenshot not supported on this OS ({sys.platform}).")
 
-    Args:
-        overlay: The overlay window instance.
-        fast_mode: Boolean indicating if fast mode should be used.
-    """
-    logger.debug(f"Processing screenshots (fast_mode={fast_mode})")
-    screenshots = QApplication.instance().screenshots
+class CaptureTask(QRunnable):
+    """Runs capture_screenshot on the capture thread pool and reports back through signals."""
 
-    if not screenshots:
-        overlay.update_status(f"No screenshots to process. Press {config.HOTKEY_CAPTURE} to capture.")
-        return
+    class Signals(QObject):
+        finished = Signal(object) # PIL image
+        failed = Signal(str)
 
-    status_message = "Processing screenshots (Fast Mode)..." if fast_mode else "Processing screenshots..."
-    overlay.update_status(status_message)
+    def __init__(self):
+        super().__init__()
+        # Created on the UI thread, so connected slots are called there
+        self.signals = CaptureTask.Signals()
 
-    # Reset the output area before starting
-    overlay.update_output("# Analyzing Problem...\n\n*Processing your screenshots and generating solution...*")
+    def run(self):
+        try:
+            image = downscale_frame(capture_screenshot())
+            # Fingerprint the pixels so repeated captures of an unchanged screen can be shared
+            image.info["fingerprint"] = hashlib.blake2b(image.tobytes(), digest_size=16).digest()
+        except CaptureError as e:
+            self.signals.failed.emit(str(e))
+        except Exception as e:
+            # General error catching for the whole capture
+            logger.error(f"Unexpected error during screenshot capture: {e}", exc_info=True)
+            self.signals.failed.emit(f"Screenshot error: {e}")
+        else:
+            self.signals.finished.emit(image)
 
-    if MOCK_MODE:
-        # Use mock data for testing without backend
-        logger.debug("Using mock data (MOCK_MODE is enabled)")
-        mock_output = """# Two Sum
+class WarmupTask(QRunnable):
+    """Pays one-time capture and encoder setup costs at startup instead of on the first capture."""
+
+    def run(self):
+        try:
+            if sys.platform == 'win32':
+                get_screen_grabber().monitors # Opens this thread's grabber and enumerates the monitors
+            # The first save loads PIL's JPEG plugin and libjpeg
+            encode_jpeg(Image.new("RGB", (16, 16)))
+        except Exception as e:
+            logger.debug("Capture warm-up failed: %s", e)
+
+# Analysis shown instead of calling the API when MOCK_MODE is enabled
+MOCK_OUTPUT = """# Two Sum
 
 ## Problem Description
 Given an array of integers `nums` and an integer `target`, return indices of the two numbers such that they add up to target.
@@ -499,68 +645,202 @@ For example, if nums = [2, 7, 11, 15] and target = 9:
 - Remember that array indices are 0-based
 - Make sure to check if the complement exists before adding the current number
 """
-        # Simulate async process
-        def mock_response():
-            time.sleep(1)  # Simulate a short delay
-            overlay.update_output(mock_output)
-            overlay.update_status("Processing complete. Use Ctrl+Alt+Arrows to move the window.")
-            QApplication.instance().screenshots = []  # Clear screenshots after processing
-
-        # Start mock processing in a separate thread
-        mock_thread = threading.Thread(target=mock_response)
-        mock_thread.daemon = True
-        mock_thread.start()
-    else:
-        # Use the direct API client instead of backend
-        try:
-            # Use our ApiClient for direct processing
-            api_client = ApiClient()
-            
-            # Connect signals
-            api_client.output_update_signal.connect(overlay.update_output)
-            api_client.status_update_signal.connect(overlay.update_status)
-            
-            # *** Add logging here ***
-            logger.debug(f"[main.py] Calling api_client.process_images with fast_mode={fast_mode}")
-            # Process the images directly
-            result = api_client.process_images(screenshots, fast_mode=fast_mode)
-            
-            # We don't need to store last_problem_data in the app instance anymore
-            # since we're using static class variables in ApiClient
-            
-            # Processing continues asynchronously, will update UI via signals
-        except Exception as e:
-            logger.error(f"Error in API processing: {e}")
-            overlay.update_status(f"Error: {str(e)}")
-            overlay.update_output(f"# Error Processing Screenshots\n\nThere was an error processing your screenshots:\n\n```\n{str(e)}\n```\n\nPlease try again.")
-            QApplication.instance().screenshots = []
-
-def move_overlay(overlay, direction):
-    logger.debug(f"Moving overlay: {direction}")
-    pos = overlay.pos()
-    step = config.OVERLAY_MOVEMENT_STEP # Use config value
-
-    if direction == 'left':
-        overlay.move(pos.x() - step, pos.y())
-    elif direction == 'right':
-        overlay.move(pos.x() + step, pos.y())
-    elif direction == 'up':
-        overlay.move(pos.x(), pos.y() - step)
-    elif direction == 'down':
-        overlay.move(pos.x(), pos.y() + step)
-
-def reset_screenshots(overlay):
-    """Reset/clear all captured screenshots"""
-    app = QApplication.instance()
-    previous_count = len(app.screenshots) if hasattr(app, 'screenshots') else 0
-    
-    # Clear screenshots
-    app.screenshots = []
-    
-    # Update UI
-    overlay.update_status(f"Screenshots reset. {previous_count} screenshot(s) cleared.")
-    
-    logger.debug(f"Reset {previous_count} screenshots")
+MOCK_RESPONSE_DELAY_MS = 1000
+
+class OverlayMover(QObject):
+    """Coalesces overlay moves so key auto-repeat moves the window at most once per frame."""
+
+    def __init__(self, overlay):
+        super().__init__()
+        self.overlay = overlay
+        self._pending_dx = 0
+        self._pending_dy = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(MOVE_COALESCE_MS)
+        self._timer.timeout.connect(self._apply_pending_move)
+
+    @Slot(int, int)
+    def nudge(self, dx, dy):
+        """Queue a move by (dx, dy); queued moves are applied together when the timer fires"""
+        self._pending_dx += dx
+        self._pending_dy += dy
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _apply_pending_move(self):
+        dx, dy = self._pending_dx, self._pending_dy
+        self._pending_dx = self._pending_dy = 0
+        if dx or dy:
+            pos = self.overlay.pos()
+            self.overlay.move(pos.x() + dx, pos.y() + dy)
+
+class HotkeyController(QObject):
+    """Handles the hotkey actions and owns the captured screenshots."""
+
+    def __init__(self, overlay):
+        super().__init__()
+        self.overlay = overlay
+        # Bounded, so forgotten captures can't pile up
+        self._screenshots = deque(maxlen=config.MAX_SCREENSHOTS)
+        # Client for screenshot analysis. Kept for the lifetime of the controller: it
+        # delivers the last streamed output through a queued slot of its own, after
+        # process_images has returned
+        self._api_client = None
+        # Captures waiting for the overlay to disappear from the screen (see take_screenshot)
+        self._hidden_captures = 0
+
+    def _get_api_client(self):
+        """Return the ApiClient used for analysis, creating it (on the UI thread) on first use."""
+        if self._api_client is None:
+            self._api_client = ApiClient()
+            self._api_client.output_update_signal.connect(self.overlay.update_output)
+            self._api_client.status_update_signal.connect(self.overlay.update_status)
+        return self._api_client
+
+    @Slot()
+    def take_screenshot(self):
+        """Starts the screen capture on the thread pool so it doesn't block the UI."""
+        logger.debug("Initiating screenshot capture")
+        overlay = self.overlay
+        if overlay.is_excluded_from_capture():
+            # The overlay is kept out of captures at the window level (display affinity on
+            # Windows, sharing type on macOS), so it can stay visible and the grab starts now
+            self._start_capture()
+            return
+        # Otherwise hide it and give the compositor time to remove it before grabbing
+        if overlay.isVisible() or self._hidden_captures:
+            overlay.hide()
+            self._hidden_captures += 1
+        QTimer.singleShot(config.SCREENSHOT_DELAY_MS, self._start_capture)
+
+    @Slot()
+    def _start_capture(self):
+        """Starts a CaptureTask; the result arrives in store_screenshot or capture_failed."""
+        task = CaptureTask()
+        task.signals.finished.connect(self.store_screenshot)
+        task.signals.failed.connect(self.capture_failed)
+        get_capture_pool().start(task)
+
+    @Slot(object)
+    def store_screenshot(self, image):
+        """Stores a captured screenshot (called on the UI thread when a CaptureTask finishes)."""
+        screenshots = self._screenshots
+        if screenshots and getattr(screenshots[-1], "info", {}).get("fingerprint") == image.info.get("fingerprint"):
+            # Same pixels as the previous capture (e.g. a double-pressed hotkey): store the
+            # existing frame again so it is only encoded and uploaded once
+            logger.debug("Capture is identical to the previous screenshot, reusing it")
+            image = screenshots[-1]
+        if len(screenshots) == screenshots.maxlen:
+            logger.info("Screenshot limit (%s) reached, dropping the oldest screenshot", screenshots.maxlen)
+        screenshots.append(image)
+        screenshot_count = len(screenshots)
+        self.overlay.update_status(f"Screenshot {screenshot_count} captured. Press CTRL+SHIFT+ENTER to process.")
+        logger.info(f"Screenshot {screenshot_count} captured and stored.")
+        self.show_overlay_after_capture()
+
+    @Slot(str)
+    def capture_failed(self, message):
+        """Reports a failed screenshot (called on the UI thread when a CaptureTask fails)."""
+        self.overlay.update_status(message)
+        self.show_overlay_after_capture()
+
+    def show_overlay_after_capture(self):
+        """Show the overlay again once every capture it was hidden for has finished, even if errors occurred."""
+        if not self._hidden_captures:
+            return
+        self._hidden_captures -= 1
+        if not self._hidden_captures:
+            logger.debug("Showing overlay after capture attempt.")
+            self.overlay.show()
+
+    @Slot()
+    def process(self):
+        self.process_screenshots(fast_mode=False)
+
+    @Slot()
+    def process_fast(self):
+        self.process_screenshots(fast_mode=True)
+
+    def process_screenshots(self, fast_mode=False):
+        """Initiates screenshot processing via ApiClient.
+
+        Args:
+            fast_mode: Boolean indicating if fast mode should be used.
+        """
+        logger.debug("Processing screenshots (fast_mode=%s)", fast_mode)
+        overlay = self.overlay
+        screenshots = self._screenshots
+
+        if not screenshots:
+            overlay.update_status(f"No screenshots to process. Press {config.HOTKEY_CAPTURE} to capture.")
+            return
+
+        status_message = "Processing screenshots (Fast Mode)..." if fast_mode else "Processing screenshots..."
+        overlay.update_status(status_message)
+
+        # A repeated follow-up must not be answered from the previous problem's response
+        overlay.forget_follow_up_response()
+
+        # Reset the output area before starting
+        overlay.update_output("# Analyzing Problem...\n\n*Processing your screenshots and generating solution...*")
+
+        if MOCK_MODE:
+            # Use mock data for testing without backend
+            logger.debug("Using mock data (MOCK_MODE is enabled)")
+            # Simulate a short delay on the UI thread's event loop (no thread needed)
+            QTimer.singleShot(MOCK_RESPONSE_DELAY_MS, self.show_mock_output)
+        else:
+            # Use the direct API client instead of backend
+            try:
+                # Use our ApiClient for direct processing (signals are connected once, on creation)
+                api_client = self._get_api_client()
+                
+                # *** Add logging here ***
+                logger.debug("[main.py] Calling api_client.process_images with fast_mode=%s", fast_mode)
+                # Process the images directly
+                # Pass a snapshot so captures or a reset during processing don't affect this request
+                api_client.process_images(list(screenshots), fast_mode=fast_mode)
+                
+                # We don't need to store last_problem_data in the app instance anymore
+                # since we're using static class variables in ApiClient
+                
+                # Processing continues asynchronously, will update UI via signals
+            except Exception as e:
+                logger.error(f"Error in API processing: {e}")
+                overlay.update_status(f"Error: {str(e)}")
+                overlay.update_output(f"# Error Processing Screenshots\n\nThere was an error processing your screenshots:\n\n```\n{str(e)}\n```\n\nPlease try again.")
+                screenshots.clear()
+
+    @Slot()
+    def show_mock_output(self):
+        """Display the mock analysis as if it had come back from the API"""
+        self.overlay.update_output(MOCK_OUTPUT)
+        self.overlay.update_status("Processing complete. Use Ctrl+Alt+Arrows to move the window.")
+        self._screenshots.clear()  # Clear screenshots after processing
+
+    @Slot()
+    def reset_screenshots(self):
+        """Reset/clear all captured screenshots"""
+        previous_count = len(self._screenshots)
+        
+        # Clear screenshots
+        self._screenshots.clear()
+        self.overlay.forget_follow_up_response()
+
+        # Stop any analysis still streaming for the screenshots being discarded
+        if ApiClient.cancel_active_request():
+            logger.info("Cancelled running analysis on reset")
+            self.overlay.update_status(f"Screenshots reset. {previous_count} screenshot(s) cleared, analysis cancelled.")
+        else:
+            # Update UI
+            self.overlay.update_status(f"Screenshots reset. {previous_count} screenshot(s) cleared.")
+        
+        logger.debug("Reset %s screenshots", previous_count)
+
+    @Slot()
+    def follow_up(self):
+        show_follow_up_dialog(self.overlay)
 
 def show_follow_up_dialog(overlay):
     """Show the follow-up input at the bottom of the overlay"""
@@ -588,6 +868,9 @@ def main():
     #         logger.error(f"Failed to set macOS Activation Policy: {e}")
     # ---------------------------
 
+    # Use each monitor's exact device pixel ratio instead of rounding it
+    QApplication.setHighDpiScaleFactorRoundingPolicy(Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
+
     # Create Qt application
     app = QApplication(sys.argv)
 
@@ -609,35 +892,47 @@ def main():
     signal.signal(signal.SIGINT, signal_handler.handle_signal)
     signal.signal(signal.SIGTERM, signal_handler.handle_signal)
 
-    # Install a signal handler for Qt's event loop
-    # This ensures signal delivery even during Qt event processing
-    timer = QTimer()
-    timer.start(500)  # Check for signals every 500ms
-    timer.timeout.connect(lambda: None)  # Just wake up the event loop
+    # Python signal handlers only run once control returns to the interpreter, which
+    # doesn't happen while Qt's event loop is idle. The C-level handler writes the signal
+    # number to this socket, and the notifier reading it runs the handler right away.
+    wakeup_reader, wakeup_writer = socket.socketpair() # A socket so this also works on Windows
+    wakeup_reader.setblocking(False)
+    wakeup_writer.setblocking(False)
+    signal.set_wakeup_fd(wakeup_writer.fileno(), warn_on_full_buffer=False)
+    wakeup_notifier = QSocketNotifier(wakeup_reader.fileno(), QSocketNotifier.Type.Read)
+    wakeup_notifier.activated.connect(lambda: wakeup_reader.recv(64))
 
     # Create overlay window
     overlay = OverlayWindow()
 
-    # Create screenshots list
-    app.screenshots = []
+    # Cached monitor geometry must be refreshed when displays are added, removed or swapped
+    app.screenAdded.connect(invalidate_screen_grabbers)
+    app.screenRemoved.connect(invalidate_screen_grabbers)
+    app.primaryScreenChanged.connect(invalidate_screen_grabbers)
+
+    # Warm up capture and encoding in the background while the overlay comes up
+    get_capture_pool().start(WarmupTask())
 
     # Create and start hotkey handler
     hotkey_handler = HotkeyHandler()
     hotkey_handler.start_listener() # Start the listener thread
 
+    # Hotkey moves are batched into at most one window move per frame
+    overlay_mover = OverlayMover(overlay)
+    hotkey_controller = HotkeyController(overlay)
+
     # Connect signals to slots
-    hotkey_handler.capture_signal.connect(lambda: take_screenshot(overlay))
-    hotkey_handler.toggle_signal.connect(overlay.toggle_visibility)
-    hotkey_handler.process_signal.connect(lambda: process_screenshots(overlay, fast_mode=False))
-    hotkey_handler.process_fast_signal.connect(lambda: process_screenshots(overlay, fast_mode=True)) # Connect fast signal
-    hotkey_handler.move_left_signal.connect(lambda: move_overlay(overlay, 'left'))
-    hotkey_handler.move_right_signal.connect(lambda: move_overlay(overlay, 'right'))
-    hotkey_handler.move_up_signal.connect(lambda: move_overlay(overlay, 'up'))
-    hotkey_handler.move_down_signal.connect(lambda: move_overlay(overlay, 'down'))
-    hotkey_handler.toggle_capture_visibility_signal.connect(overlay.toggle_capture_visibility)
-    hotkey_handler.reset_screenshots_signal.connect(lambda: reset_screenshots(overlay))
-    hotkey_handler.follow_up_signal.connect(lambda: show_follow_up_dialog(overlay))
-    hotkey_handler.focus_signal.connect(overlay.bring_to_front)
+    # Hotkey signals may be emitted on the keyboard/pynput threads, so connections to UI
+    # objects are made queued explicitly rather than re-checking threads on every emit
+    hotkey_handler.capture_signal.connect(hotkey_controller.take_screenshot, Qt.QueuedConnection)
+    hotkey_handler.toggle_signal.connect(overlay.toggle_visibility, Qt.QueuedConnection)
+    hotkey_handler.process_signal.connect(hotkey_controller.process, Qt.QueuedConnection)
+    hotkey_handler.process_fast_signal.connect(hotkey_controller.process_fast, Qt.QueuedConnection) # Connect fast signal
+    hotkey_handler.move_signal.connect(overlay_mover.nudge, Qt.QueuedConnection)
+    hotkey_handler.toggle_capture_visibility_signal.connect(overlay.toggle_capture_visibility, Qt.QueuedConnection)
+    hotkey_handler.reset_screenshots_signal.connect(hotkey_controller.reset_screenshots, Qt.QueuedConnection)
+    hotkey_handler.follow_up_signal.connect(hotkey_controller.follow_up, Qt.QueuedConnection)
+    hotkey_handler.focus_signal.connect(overlay.bring_to_front, Qt.QueuedConnection)
 
     # Initialize UI
     overlay.update_status(f"Ready. Press {config.HOTKEY_CAPTURE} to capture screen.")
@@ -663,6 +958,7 @@ The assistant will analyze the problem and provide a solution. If you have quest
     def cleanup():
         logger.info("Cleaning up before exit...")
         hotkey_handler.stop_listener() # Stop the appropriate listener
+        close_screen_grabbers()
 
     app.aboutToQuit.connect(cleanup)
 
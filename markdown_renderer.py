@@ -0,0 +1,170 @@
+import re
+from functools import lru_cache
+
+import markdown
+from markdown.preprocessors import Preprocessor
+from pygments import highlight
+from pygments.lexers import get_lexer_by_name, PythonLexer
+from pygments.formatters import HtmlFormatter
+from pygments.util import ClassNotFound
+
+# Markdown/pygments rendering for the overlay output. overlay.py imports this module on
+# the first render, so loading markdown and pygments doesn't delay showing the window.
+
+# Constants for styling (yes, I know, slop.)
+BASE_STYLE = """
+    body { color: white; font-family: 'Segoe UI', Arial, sans-serif; }
+    h1, h2, h3 { color: #e6e6e6; }
+    a { color: #58a6ff; }
+    blockquote { border-left: 4px solid #565656; padding-left: 10px; margin-left: 20px; color: #a0a0a0; }
+    table { border-collapse: collapse; }
+    th, td { border: 1px solid #565656; padding: 6px; }
+    th { background-color: #424242; }
+
+    .codehilite pre {
+        white-space: pre-wrap;
+        word-wrap: break-word;
+    }
+
+    div.codehilite { background-color: rgba(45,45,45,0.5); padding: 10px; border-radius: 5px; overflow-x: auto; margin: 1em 0; }
+    pre { margin: 0; }
+"""
+
+# Formatter shared by every highlighted code block (it holds no per-call state)
+CODE_FORMATTER = HtmlFormatter(style='monokai')
+
+# Token colours come from the same formatter that highlights the code, so every class it
+# can emit is covered. Only the token rules are kept (no line-number rules, no comments)
+# to keep the document that is re-parsed on every render small.
+PYGMENTS_STYLE = "<style>{}\n{}\n</style>".format(
+    BASE_STYLE,
+    "\n".join(
+        re.sub(r"\s*/\*.*?\*/", "", rule)
+        for rule in CODE_FORMATTER.get_style_defs('.codehilite').splitlines()
+        if rule.startswith(".codehilite .")
+    ),
+)
+
+# Layout styles for the rendered output document
+MARKDOWN_STYLE = """
+<style>
+    body { 
+        background-color: rgba(40, 40, 40, 0.1);
+        color: white;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        padding: 0;
+        margin: 0;
+    }
+    pre, code, .codehilite {
+        font-family: 'JetBrains Mono', 'Consolas', monospace;
+    }
+    h1 { font-size: 24px; margin-top: 10px; }
+    h2 { font-size: 20px; margin-top: 8px; }
+    h3 { font-size: 16px; margin-top: 6px; }
+    p { margin: 8px 0; }
+    ul, ol { margin: 8px 0; padding-left: 20px; }
+</style>
+"""
+
+# Everything around the rendered markdown is fixed, so it is assembled once
+HTML_DOCUMENT_PREFIX = f"<!DOCTYPE html><html><head>{PYGMENTS_STYLE}{MARKDOWN_STYLE}</head><body>"
+HTML_DOCUMENT_SUFFIX = "</body></html>"
+
+# Fenced code blocks with an optional language specification
+FENCED_CODE_RE = re.compile(r'```(\w+)?\n(.*?)```', re.DOTALL)
+
+# Lines whose effect can reach past the next heading: reference link definitions
+# (used anywhere in the document) and raw HTML blocks (which may contain headings)
+CROSS_SECTION_RE = re.compile(r'^ {0,3}(?:\[[^\]\n]+\]:|<)', re.MULTILINE)
+
+# Opening line of a fenced code block (fenced_code accepts backticks and tildes)
+FENCE_OPEN_RE = re.compile(r'`{3,}|~{3,}')
+
+def split_markdown_sections(md_text):
+    """Split markdown before each heading line that is outside a code fence.
+
+    Headings always start a new block, so the sections convert to the same HTML
+    separately as they do together once joined with newlines. Text with reference
+    link definitions or raw HTML blocks is returned as a single section.
+    """
+    if CROSS_SECTION_RE.search(md_text):
+        return [md_text]
+    sections = []
+    start = pos = 0
+    fence = None # Opening fence of the code block being scanned
+    for line in md_text.splitlines(keepends=True):
+        if fence is None:
+            if pos > start and line.startswith("#"):
+                sections.append(md_text[start:pos])
+                start = pos
+            match = FENCE_OPEN_RE.match(line)
+            if match:
+                fence = match.group()
+        elif line.rstrip("\r\n").rstrip(" ") == fence:
+            # Like fenced_code, only the same run of backticks or tildes closes the block
+            fence = None
+        pos += len(line)
+    sections.append(md_text[start:])
+    return sections
+
+def render_markdown_sections(md_text, convert_section):
+    """Convert md_text one section at a time and join the HTML like a whole-document conversion"""
+    # Markdown separates blocks with newlines; blank-only sections render to nothing
+    return "\n".join(filter(None, map(convert_section, split_markdown_sections(md_text))))
+
+# Common spellings of fence languages mapped to one name, so variants share cache entries
+LANGUAGE_ALIASES = {
+    'py': 'python', 'python3': 'python', 'py3': 'python',
+    'js': 'javascript', 'ts': 'typescript',
+    'sh': 'bash', 'shell': 'bash', 'zsh': 'bash',
+    'cxx': 'cpp', 'cc': 'cpp', 'hpp': 'cpp',
+    'golang': 'go', 'rs': 'rust', 'kt': 'kotlin', 'cs': 'csharp',
+}
+
+@lru_cache(maxsize=64)
+def get_code_lexer(lang):
+    """Return the pygments lexer for a fenced code block language, cached per name"""
+    try:
+        return get_lexer_by_name(lang, stripall=True)
+    except ClassNotFound:
+        return PythonLexer()  # Default to Python if language not recognized
+
+@lru_cache(maxsize=256)
+def highlight_code_block(lang, code):
+    """Highlight a fenced code block; blocks earlier in a streamed answer repeat on every render"""
+    return highlight(code, get_code_lexer(lang), CODE_FORMATTER)
+
+class CodeBlockPreprocessor(Preprocessor):
+    """Replaces fenced code blocks with highlighted HTML before markdown parses the text"""
+
+    def run(self, lines):
+        text = FENCED_CODE_RE.sub(self.replace_code_block, "\n".join(lines))
+        return text.split("\n")
+
+    def replace_code_block(self, match):
+        lang = (match.group(1) or 'text').lower()
+        lang = LANGUAGE_ALIASES.get(lang, lang)
+        code = match.group(2)
+
+        # Highlight the code with the lexer for the specified language
+        highlighted = highlight_code_block(lang, code)
+
+        # Stash the highlighted block so markdown passes it through instead of parsing it again
+        placeholder = self.md.htmlStash.store(f'<div class="codehilite">{highlighted}</div>')
+        return f"\n\n{placeholder}\n\n"
+
+class CodeBlockExtension(markdown.extensions.Extension):
+    def extendMarkdown(self, md):
+        # Runs ahead of fenced_code (priority 25), so highlighted blocks never reach it
+        md.preprocessors.register(CodeBlockPreprocessor(md), 'highlighted_code_block', 26)
+
+def create_markdown_processor():
+    """Create the markdown processor used for the overlay output"""
+    return markdown.Markdown(
+        extensions=[
+            'fenced_code',
+            'tables',
+            'nl2br',
+            CodeBlockExtension()
+        ]
+    )
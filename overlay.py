@@ -1,16 +1,15 @@
-from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QTextEdit, QLabel, QHBoxLayout, QPushButton, QMenu
+from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QTextEdit, QLabel, QHBoxLayout, QPushButton, QMenu, QGraphicsOpacityEffect
 from PySide6.QtCore import (Qt, QPoint, Slot, QObject, Signal as QtSignal, QOperatingSystemVersion, 
-                           QThread, QTimer, QPropertyAnimation, QEasingCurve, QCoreApplication)
-from PySide6.QtGui import QColor, QPalette
-from pygments import highlight
-from pygments.lexers import get_lexer_by_name, PythonLexer
-from pygments.formatters import HtmlFormatter
-import markdown
-import re
+                           QTimer, QPropertyAnimation, QEasingCurve, QCoreApplication,
+                           QRunnable, QThreadPool, QEvent)
+from PySide6.QtGui import QColor, QFont, QPalette
 import logging
+import re
 import sys
-import os
-from functools import lru_cache
+import time
+import traceback
+import hashlib
+from collections import OrderedDict
 
 # Local configuration import
 import config
@@ -39,86 +38,11 @@ from typing import Optional
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Constants for styling (yes, I know, slop.)
-PYGMENTS_STYLE = """
-<style>
-    body { color: white; font-family: 'Segoe UI', Arial, sans-serif; }
-    h1, h2, h3 { color: #e6e6e6; }
-    a { color: #58a6ff; }
-    blockquote { border-left: 4px solid #565656; padding-left: 10px; margin-left: 20px; color: #a0a0a0; }
-    table { border-collapse: collapse; }
-    th, td { border: 1px solid #565656; padding: 6px; }
-    th { background-color: #424242; }
-
-    .codehilite pre {
-        white-space: pre-wrap;
-        word-wrap: break-word;
-    }
-
-    /* Pygments styling */
-    div.codehilite { background-color: rgba(45,45,45,0.5); padding: 10px; border-radius: 5px; overflow-x: auto; margin: 1em 0; }
-    pre { margin: 0; }
-    .codehilite .hll { background-color: #49483e }
-    .codehilite .c { color: #75715e } /* Comment */
-    .codehilite .err { color: #f92672; } /* Error */
-    .codehilite .k { color: #66d9ef; font-weight: bold } /* Keyword */
-    .codehilite .l { color: #ae81ff } /* Literal */
-    .codehilite .n { color: #f8f8f2 } /* Name */
-    .codehilite .o { color: #f92672 } /* Operator */
-    .codehilite .p { color: #f8f8f2 } /* Punctuation */
-    .codehilite .cm { color: #75715e } /* Comment.Multiline */
-    .codehilite .cp { color: #75715e } /* Comment.Preproc */
-    .codehilite .c1 { color: #75715e } /* Comment.Single */
-    .codehilite .cs { color: #75715e } /* Comment.Special */
-    .codehilite .ge { font-style: italic } /* Generic.Emph */
-    .codehilite .gs { font-weight: bold } /* Generic.Strong */
-    .codehilite .kc { color: #66d9ef; font-weight: bold } /* Keyword.Constant */
-    .codehilite .kd { color: #66d9ef; font-weight: bold } /* Keyword.Declaration */
-    .codehilite .kn { color: #f92672 } /* Keyword.Namespace */
-    .codehilite .kp { color: #66d9ef } /* Keyword.Pseudo */
-    .codehilite .kr { color: #66d9ef; font-weight: bold } /* Keyword.Reserved */
-    .codehilite .kt { color: #66d9ef } /* Keyword.Type */
-    .codehilite .ld { color: #e6db74 } /* Literal.Date */
-    .codehilite .m { color: #ae81ff } /* Literal.Number */
-    .codehilite .s { color: #e6db74 } /* Literal.String */
-    .codehilite .na { color: #a6e22e } /* Name.Attribute */
-    .codehilite .nb { color: #f8f8f2 } /* Name.Builtin */
-    .codehilite .nc { color: #a6e22e; font-weight: bold } /* Name.Class */
-    .codehilite .no { color: #66d9ef } /* Name.Constant */
-    .codehilite .nd { color: #a6e22e } /* Name.Decorator */
-    .codehilite .ni { color: #f8f8f2 } /* Name.Entity */
-    .codehilite .ne { color: #a6e22e } /* Name.Exception */
-    .codehilite .nf { color: #a6e22e } /* Name.Function */
-    .codehilite .nl { color: #f8f8f2 } /* Name.Label */
-    .codehilite .nn { color: #f8f8f2 } /* Name.Namespace */
-    .codehilite .nx { color: #a6e22e } /* Name.Other */
-    .codehilite .py { color: #f8f8f2 } /* Name.Property */
-    .codehilite .nt { color: #f92672 } /* Name.Tag */
-    .codehilite .nv { color: #f8f8f2 } /* Name.Variable */
-    .codehilite .ow { color: #f92672 } /* Operator.Word */
-    .codehilite .w { color: #f8f8f2 } /* Text.Whitespace */
-    .codehilite .mf { color: #ae81ff } /* Literal.Number.Float */
-    .codehilite .mh { color: #ae81ff } /* Literal.Number.Hex */
-    .codehilite .mi { color: #ae81ff } /* Literal.Number.Integer */
-    .codehilite .mo { color: #ae81ff } /* Literal.Number.Oct */
-    .codehilite .sb { color: #e6db74 } /* Literal.String.Backtick */
-    .codehilite .sc { color: #e6db74 } /* Literal.String.Char */
-    .codehilite .sd { color: #e6db74 } /* Literal.String.Doc */
-    .codehilite .s2 { color: #e6db74 } /* Literal.String.Double */
-    .codehilite .se { color: #ae81ff } /* Literal.String.Escape */
-    .codehilite .sh { color: #e6db74 } /* Literal.String.Heredoc */
-    .codehilite .si { color: #e6db74 } /* Literal.String.Interpol */
-    .codehilite .sx { color: #e6db74 } /* Literal.String.Other */
-    .codehilite .sr { color: #e6db74 } /* Literal.String.Regex */
-    .codehilite .s1 { color: #e6db74 } /* Literal.String.Single */
-    .codehilite .ss { color: #e6db74 } /* Literal.String.Symbol */
-    .codehilite .bp { color: #f8f8f2 } /* Name.Builtin.Pseudo */
-    .codehilite .vc { color: #f8f8f2 } /* Name.Variable.Class */
-    .codehilite .vg { color: #f8f8f2 } /* Name.Variable.Global */
-    .codehilite .vi { color: #f8f8f2 } /* Name.Variable.Instance */
-    .codehilite .il { color: #ae81ff } /* Literal.Number.Integer.Long */
-</style>
-"""
+# Enum values checked by OverlayWindow.eventFilter, looked up once rather than per event
+_KEY_PRESS = QEvent.Type.KeyPress
+_KEY_RETURN = Qt.Key_Return
+_KEY_ESCAPE = Qt.Key_Escape
+_SHIFT_MODIFIER = Qt.ShiftModifier
 
 # Windows specific settings
 if sys.platform == 'win32':
@@ -148,6 +72,11 @@ if sys.platform == 'win32':
         ACCENT_ENABLE_BLURBEHIND = 3
         WCA_ACCENT_POLICY = 19
 
+        # Resolve SetWindowDisplayAffinity and set its prototype once instead of per call
+        SetWindowDisplayAffinity = windll.user32.SetWindowDisplayAffinity
+        SetWindowDisplayAffinity.restype = c_bool
+        SetWindowDisplayAffinity.argtypes = [HWND, DWORD]
+
         # Flag to track if we successfully loaded Windows APIs
         WINDOWS_APIS_LOADED = True
 
@@ -195,7 +124,93 @@ class SignalHelper(QObject):
     update_text_signal = QtSignal(str)
     append_text_signal = QtSignal(str)
     update_status_signal = QtSignal(str)
-    stop_pulse_signal = QtSignal()  # New signal to safely stop the pulse timer
+
+class MarkdownRenderTask(QRunnable):
+    """Renders output markdown to HTML on the render pool and reports back through a signal."""
+
+    class Signals(QObject):
+        finished = QtSignal(int, str) # Render generation, rendered HTML document
+
+    def __init__(self, render, content, generation):
+        super().__init__()
+        self.render = render
+        self.content = content
+        self.generation = generation
+        # Created on the UI thread, so connected slots are called there
+        self.signals = MarkdownRenderTask.Signals()
+
+    def run(self):
+        self.signals.finished.emit(self.generation, self.render(self.content))
+
+# Anything markdown (with nl2br) would turn into more than one paragraph of the same text:
+# inline and block syntax, HTML and entities, list items, indented code, setext
+# underlines and paragraph breaks. Output matching none of it is shown as plain text.
+_MARKDOWN_SYNTAX_RE = re.compile(r'[#`*_\[|>\-+<&\\]|^ *\d+[.)]|^(?: {4}|\t)|^ *=|\n[ \t]*\n', re.MULTILINE)
+
+# Font families of the rendered document's body (see markdown_renderer.BASE_STYLE), so
+# plain-text output looks the same as rendered output
+_DOCUMENT_FONT_FAMILIES = ["Segoe UI", "Arial"]
+
+def _has_markdown_syntax(content):
+    """Whether markdown conversion would change how content is shown"""
+    return _MARKDOWN_SYNTAX_RE.search(content) is not None
+
+# Messages shown while a follow-up runs
+_FOLLOW_UP_SUBMITTED_MSG = "# Processing Follow-up Request...\n\n*Please wait while we analyze your follow-up request...*"
+_FOLLOW_UP_PROCESSING_MSG = "# Processing Follow-up Request\n\nConnecting to API to process your request. Please wait..."
+_FOLLOW_UP_FALLBACK_MSG = (
+    "# Follow-up Processing Issue\n\n"
+    "The follow-up was processed, but no response was received from the AI.\n\n"
+    "This can happen if:\n"
+    "- The AI service had a temporary issue\n"
+    "- The follow-up request was unclear\n"
+    "- There was an internal processing error\n\n"
+    "Please try again with a more specific follow-up request."
+)
+_FOLLOW_UP_ERROR_TEMPLATE = "Error Processing Follow-up\n\nThere was an error processing your follow-up:\n\n{error}\n\nPlease try again."
+
+class FollowUpTask(QRunnable):
+    """Runs a follow-up request on the thread pool and reports back through signals."""
+
+    class Signals(QObject):
+        result_ready = QtSignal(str)
+        error_ready = QtSignal(str) # Plain text, shown without markdown rendering
+        status_update = QtSignal(str)
+        finished = QtSignal(str, bool) # Follow-up text, whether a response was shown
+
+    def __init__(self, api_client, follow_up_text):
+        super().__init__()
+        self.api_client = api_client
+        self.follow_up_text = follow_up_text
+        # Created on the UI thread, so connected slots are called there
+        self.signals = FollowUpTask.Signals()
+
+    def run(self):
+        succeeded = False
+        try:
+            # Emit debug message to confirm signal connections are working
+            self.signals.result_ready.emit(_FOLLOW_UP_PROCESSING_MSG)
+            
+            # Process follow-up - output reaches the overlay through the client's signals
+            self.signals.status_update.emit("Processing follow-up request...")
+            received_output = self.api_client.process_follow_up(self.follow_up_text)
+            
+            # If we didn't receive any output, show a fallback message
+            if not received_output:
+                logger.warning("No output signals received from API client during follow-up")
+                self.signals.result_ready.emit(_FOLLOW_UP_FALLBACK_MSG)
+            else:
+                succeeded = True
+        except Exception as e:
+            error_text = f"Error in follow-up processing: {str(e)}"
+            error_trace = traceback.format_exc()
+            logger.error(error_text)
+            logger.error(error_trace)
+            self.signals.status_update.emit(f"Error: {str(e)}")
+            # The traceback is in the log; the overlay only shows the message
+            self.signals.error_ready.emit(_FOLLOW_UP_ERROR_TEMPLATE.format(error=e))
+        finally:
+            self.signals.finished.emit(self.follow_up_text, succeeded)
 
 class OverlayWindow(QMainWindow):
     def __init__(self):
@@ -217,18 +232,36 @@ class OverlayWindow(QMainWindow):
         self.signal_helper.update_text_signal.connect(self._update_output_text)
         self.signal_helper.append_text_signal.connect(self._append_output_text)
         self.signal_helper.update_status_signal.connect(self._update_status_text)
-        self.signal_helper.stop_pulse_signal.connect(self._stop_pulse_timer, Qt.ConnectionType.QueuedConnection)
         
-        # Worker thread for processing follow-up requests
-        self.worker_thread = None
-        self.pulse_timer = None
+        # Output renders are throttled: an update is rendered right away, then updates
+        # arriving within the interval are coalesced and only the latest is rendered
+        self._pending_content = None
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setInterval(config.OUTPUT_RENDER_INTERVAL_MS)
+        self._render_timer.timeout.connect(self._flush_pending_render)
+        # Markdown and pygments run off the UI thread; one render thread, since the
+        # markdown processor and the render caches are not shared between threads
+        self._render_pool = QThreadPool(self)
+        self._render_pool.setMaxThreadCount(1)
+        self._render_in_flight = False
+        self._render_generation = 0 # Bumped when the output is replaced without rendering
+        self._shown_html = None # Document currently set on the output area
+
+        # Client for follow-up requests
+        self._api_client = None # Created by _get_api_client on the first follow-up
+        # (text digest, monotonic finish time, output) of the last answered follow-up
+        self._last_follow_up = None
+        self._latest_output = None # Most recent content passed to _update_output_text
+        self.pulse_animation = None
         
-        # Store exclusion status
-        self._excluded_from_capture = True
+        # Store exclusion status; set by exclude_from_capture once display affinity is applied
+        self._excluded_from_capture = False
 
         # macOS specific state
         if sys.platform == 'darwin':
-            self._macos_capture_excluded = True # Default to excluded
+            # Default to excluded; cleared if the native settings can't be applied
+            self._macos_capture_excluded = MACOS_NATIVE_APIS_LOADED
 
         # Apply macOS Native Settings
         if sys.platform == 'darwin' and MACOS_NATIVE_APIS_LOADED:
@@ -238,6 +271,23 @@ class OverlayWindow(QMainWindow):
         # Current markdown content
         self.current_markdown = ""
 
+        # Output update counters, used to log only every 20th update
+        self._log_count = 0
+        self._append_log_count = 0
+
+        # Rendered HTML for recently shown markdown, keyed by a digest of the text (LRU order)
+        self._md_cache = OrderedDict()
+        self._md_cache_max = 32
+        # Rendered HTML for individual markdown sections (see split_markdown_sections)
+        self._section_cache = OrderedDict()
+        self._section_cache_max = 64
+        # Rendered HTML for the fixed follow-up messages. Kept apart from the LRU caches,
+        # which a streamed response fills with intermediate renders and would evict them from
+        self._fixed_html = dict.fromkeys((_FOLLOW_UP_SUBMITTED_MSG, _FOLLOW_UP_PROCESSING_MSG, _FOLLOW_UP_FALLBACK_MSG))
+        # Markdown converter, built on first render and reused; only the single
+        # render-pool thread uses it, so it needs no lock
+        self._markdown_processor = None
+
         # Set default size and position
         desktop = self.screen().geometry()
         self.resize(int(desktop.width() * 0.25), desktop.height())
@@ -352,7 +402,9 @@ class OverlayWindow(QMainWindow):
 
         # Status bar
         self.status = QLabel("Press CTRL+SHIFT+H to capture screen")
-        self.status.setStyleSheet("color: rgba(200, 200, 200, 200); font-style: italic; font-size: 11px;")
+        # Default status style, restored when a follow-up finishes
+        self._status_style_default = "color: rgba(200, 200, 200, 200); font-style: italic; font-size: 11px;"
+        self.status.setStyleSheet(self._status_style_default)
         self.status.setAlignment(Qt.AlignCenter)
 
         # Add widgets to layout
@@ -362,6 +414,11 @@ class OverlayWindow(QMainWindow):
         self.layout.addWidget(self.follow_up_container)  # Add follow-up container instead
         self.layout.addWidget(self.status)
 
+        # Exclude the window from captures before it is first shown. winId() creates the
+        # native window, and the display affinity stays with it across hide()/show().
+        if sys.platform == 'win32' and WINDOWS_APIS_LOADED:
+            self.exclude_from_capture()
+
         # Initialize visibility
         self.is_visible = True
         self.show()
@@ -404,6 +461,7 @@ class OverlayWindow(QMainWindow):
         ns_window = self._get_native_nswindow()
         if not ns_window:
             logger.error("Cannot apply native macOS settings: Failed to get NSWindow.")
+            self._macos_capture_excluded = False
             return
             
         try:
@@ -433,6 +491,7 @@ class OverlayWindow(QMainWindow):
 
         except Exception as e:
             logger.error(f"Failed to apply macOS native settings: {e}", exc_info=True)
+            self._macos_capture_excluded = False
 
     def exclude_from_capture(self):
         """Apply Windows-specific methods to exclude window from capture but keep visible to user"""
@@ -456,11 +515,6 @@ class OverlayWindow(QMainWindow):
             # Use ONLY SetWindowDisplayAffinity which makes window invisible to capture but visible to user
             # DO NOT use DwmSetWindowAttribute with DWMWA_CLOAK which makes window completely invisible
             try:
-                # Define the SetWindowDisplayAffinity function
-                SetWindowDisplayAffinity = windll.user32.SetWindowDisplayAffinity
-                SetWindowDisplayAffinity.restype = c_bool
-                SetWindowDisplayAffinity.argtypes = [HWND, DWORD]
-
                 # Apply the capture exclusion flag
                 result = SetWindowDisplayAffinity(hwnd, WDA_EXCLUDEFROMCAPTURE)
                 if result:
@@ -475,13 +529,11 @@ class OverlayWindow(QMainWindow):
         except Exception as e:
             logger.error(f"Failed to exclude window from capture: {e}")
 
-    def showEvent(self, event):
-        """Override show event to reapply capture exclusion each time window is shown"""
-        super().showEvent(event)
-        # Re-apply exclusion flags when window is shown
-        if sys.platform == 'win32' and WINDOWS_APIS_LOADED:
-            from PySide6.QtCore import QTimer
-            QTimer.singleShot(100, self.exclude_from_capture)
+    def is_excluded_from_capture(self):
+        """Whether the window is currently kept out of screenshots by the OS"""
+        if sys.platform == 'darwin':
+            return self._macos_capture_excluded
+        return self._excluded_from_capture
 
     @Slot()
     def toggle_capture_visibility(self):
@@ -490,11 +542,11 @@ class OverlayWindow(QMainWindow):
             logger.debug("Toggling Windows capture visibility...")
             try:
                 hwnd = int(self.winId())
-                self._excluded_from_capture = not self._excluded_from_capture
-                SetWindowDisplayAffinity = windll.user32.SetWindowDisplayAffinity
-                new_affinity = WDA_EXCLUDEFROMCAPTURE if self._excluded_from_capture else 0
+                excluded = not self._excluded_from_capture
+                new_affinity = WDA_EXCLUDEFROMCAPTURE if excluded else 0
                 result = SetWindowDisplayAffinity(hwnd, new_affinity)
                 if result:
+                    self._excluded_from_capture = excluded
                     status = "excluded from" if self._excluded_from_capture else "visible in"
                     self.update_status(f"Window now {status} screen captures (Windows)")
                     logger.info(f"Windows capture visibility set to: {status}")
@@ -514,12 +566,11 @@ class OverlayWindow(QMainWindow):
                 return
 
             try:
-                # Toggle the state
-                self._macos_capture_excluded = not self._macos_capture_excluded
-                
-                # Set the new sharing type
-                new_sharing_type = NSWindowSharingNone if self._macos_capture_excluded else NSWindowSharingReadOnly
+                # Set the new sharing type, then record the toggled state
+                excluded = not self._macos_capture_excluded
+                new_sharing_type = NSWindowSharingNone if excluded else NSWindowSharingReadOnly
                 ns_window.setSharingType_(new_sharing_type)
+                self._macos_capture_excluded = excluded
                 
                 # Update status
                 status = "excluded from" if self._macos_capture_excluded else "visible in"
@@ -548,9 +599,6 @@ class OverlayWindow(QMainWindow):
     def update_output(self, content):
         """Thread-safe output update"""
         # Only log occasional updates to reduce spam
-        if not hasattr(self, '_log_count'):
-            self._log_count = 0
-        
         self._log_count += 1
         if self._log_count % 20 == 0:  # Only log every 20th update
             logger.debug(f"Updating output (update #{self._log_count})")
@@ -561,9 +609,6 @@ class OverlayWindow(QMainWindow):
     def append_output(self, content):
         """Thread-safe output append"""
         # Only log occasional updates to reduce spam
-        if not hasattr(self, '_append_log_count'):
-            self._append_log_count = 0
-        
         self._append_log_count += 1
         if self._append_log_count % 20 == 0:  # Only log every 20th append
             logger.debug(f"Appending output (append #{self._append_log_count})")
@@ -582,103 +627,64 @@ class OverlayWindow(QMainWindow):
         """Update status text (must be called from main thread)"""
         self.status.setText(text)
 
-    @lru_cache(maxsize=32)
     def markdown_to_html(self, md_text):
         """Convert markdown to HTML with syntax highlighting"""
+        fixed_html = self._fixed_html.get(md_text)
+        if fixed_html is not None:
+            return fixed_html
+        cache_key = hashlib.blake2b(md_text.encode(), digest_size=16).digest()
+        cached_html = self._md_cache.get(cache_key)
+        if cached_html is not None:
+            self._md_cache.move_to_end(cache_key)
+            return cached_html
         try:
-            # Use global style instead of creating it every time
-            pygments_style = PYGMENTS_STYLE
-            
+            # Imported on first use (on the render thread) rather than at startup
+            from markdown_renderer import (HTML_DOCUMENT_PREFIX, HTML_DOCUMENT_SUFFIX,
+                                           create_markdown_processor, render_markdown_sections)
+
             # Create markdown processor once and reuse
-            if not hasattr(self, '_markdown_processor'):
+            if self._markdown_processor is None:
                 logger.debug("Initializing markdown processor")
-                self._markdown_processor = markdown.Markdown(
-                    extensions=[
-                        'fenced_code',
-                        'tables',
-                        'nl2br',
-                        CodeBlockExtension()
-                    ]
-                )
-            
-            # Preprocess code blocks to apply syntax highlighting
-            preprocessed_text = self.preprocess_code_blocks(md_text)
+                self._markdown_processor = create_markdown_processor()
             
-            # Convert to HTML using the cached processor
-            html = self._markdown_processor.convert(preprocessed_text)
+            # Convert section by section: while a response streams in, only the last
+            # section changes, so the earlier ones come from the section cache
+            html = render_markdown_sections(md_text, self._convert_section)
             
-            # Reset the processor to clear any state
-            self._markdown_processor.reset()
-            
-            # Use the full HTML document format with styling
-            full_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                {pygments_style}
-                <style>
-                    body {{ 
-                        background-color: rgba(40, 40, 40, 0.1);
-                        color: white;
-                        font-family: 'Segoe UI', Arial, sans-serif;
-                        padding: 0;
-                        margin: 0;
-                    }}
-                    pre, code, .codehilite {{
-                        font-family: 'JetBrains Mono', 'Consolas', monospace;
-                    }}
-                    h1 {{ font-size: 24px; margin-top: 10px; }}
-                    h2 {{ font-size: 20px; margin-top: 8px; }}
-                    h3 {{ font-size: 16px; margin-top: 6px; }}
-                    p {{ margin: 8px 0; }}
-                    ul, ol {{ margin: 8px 0; padding-left: 20px; }}
-                </style>
-            </head>
-            <body>
-                {html}
-            </body>
-            </html>
-            """
+            # Only the rendered body changes between updates; the document head is built once
+            full_html = "".join((HTML_DOCUMENT_PREFIX, html, HTML_DOCUMENT_SUFFIX))
             
+            if md_text in self._fixed_html:
+                self._fixed_html[md_text] = full_html
+                return full_html
+            self._md_cache[cache_key] = full_html
+            if len(self._md_cache) > self._md_cache_max:
+                self._md_cache.popitem(last=False)
             return full_html
         except Exception as e:
             logger.error(f"Error converting markdown to HTML: {str(e)}")
             return f"<p>Error rendering markdown: {str(e)}</p><pre>{md_text}</pre>"
 
-    def preprocess_code_blocks(self, text):
-        """Process code blocks in markdown for syntax highlighting"""
-        # Regular expression to find code blocks with language specification
-        pattern = r'```(\w+)?\n(.*?)```'
-        
-        def replace_code_block(match):
-            lang = match.group(1) or 'text'
-            code = match.group(2)
-            
-            # Get the appropriate lexer for the specified language
-            try:
-                lexer = get_lexer_by_name(lang, stripall=True)
-            except:
-                lexer = PythonLexer()  # Default to Python if language not recognized
-                
-            # Highlight the code
-            formatter = HtmlFormatter(style='monokai')
-            highlighted = highlight(code, lexer, formatter)
-            
-            # Return the highlighted code with the div wrapper
-            return f'<div class="codehilite">{highlighted}</div>'
-            
-        # Replace all code blocks in the text
-        return re.sub(pattern, replace_code_block, text, flags=re.DOTALL)
-
-    # Remove the now-obsolete CodeBlockExtension and CodeBlockPreprocessor classes
-    # They are replaced by the more efficient preprocess_code_blocks method
+    def _convert_section(self, section):
+        """Convert one markdown section to HTML, reusing the result for repeated sections"""
+        html = self._section_cache.get(section)
+        if html is not None:
+            self._section_cache.move_to_end(section)
+            return html
+        # Convert to HTML using the cached processor, reset first so no state from an
+        # earlier (possibly failed) conversion leaks in; code blocks are highlighted
+        # by CodeBlockExtension during the same pass
+        html = self._markdown_processor.reset().convert(section)
+        self._section_cache[section] = html
+        if len(self._section_cache) > self._section_cache_max:
+            self._section_cache.popitem(last=False)
+        return html
 
     def highlight_code(self, code):
         """Directly highlight a code snippet without markdown processing"""
         try:
-            lexer = PythonLexer()
-            formatter = HtmlFormatter(style='monokai')
-            return highlight(code, lexer, formatter)
+            from markdown_renderer import highlight_code_block
+            return highlight_code_block('python', code)
         except Exception as e:
             logger.error(f"Error highlighting code: {e}")
             return f"<pre>{code}</pre>"
@@ -738,11 +744,6 @@ class OverlayWindow(QMainWindow):
             if menu.winId() is not None:
                 hwnd = int(menu.winId())
                 
-                # Define the SetWindowDisplayAffinity function
-                SetWindowDisplayAffinity = windll.user32.SetWindowDisplayAffinity
-                SetWindowDisplayAffinity.restype = c_bool
-                SetWindowDisplayAffinity.argtypes = [HWND, DWORD]
-                
                 # Apply the capture exclusion flag
                 result = SetWindowDisplayAffinity(hwnd, WDA_EXCLUDEFROMCAPTURE)
                 if not result:
@@ -768,9 +769,18 @@ class OverlayWindow(QMainWindow):
         # Hide the follow-up container
         self.follow_up_container.setVisible(False)
         self.follow_up_input.clear()
+
+        # A follow-up repeated shortly after it was answered gets the same answer again
+        last = self._last_follow_up
+        if (last is not None and last[0] == self._follow_up_digest(follow_up_text)
+                and time.monotonic() - last[1] < config.FOLLOW_UP_REPEAT_WINDOW_S):
+            logger.info("Follow-up repeated; showing the previous response")
+            self.update_output(last[2])
+            self.status.setText("Same follow-up as before; showing the previous response.")
+            return
         
         # Show immediate visual feedback
-        self.update_output("# Processing Follow-up Request...\n\n*Please wait while we analyze your follow-up request...*")
+        self.update_output(_FOLLOW_UP_SUBMITTED_MSG)
         
         # Update status with a more visible message
         self.status.setText("⚡ Processing your follow-up request...")
@@ -778,169 +788,91 @@ class OverlayWindow(QMainWindow):
             color: white; 
             font-weight: bold;
             font-size: 12px;
-            background-color: rgba(52, 152, 219, 180);
+            background-color: rgb(52, 152, 219);
             border-radius: 3px;
             padding: 3px;
         """)
         
         # Add a pulsing effect to make it very obvious
-        # Create a pulse animation for the status bar
-        self.pulse_timer = QTimer(self)
-        self.pulse_opacity = 180
-        self.pulse_increasing = True
-        
-        def pulse_effect():
-            # Change opacity to create a pulsing effect
-            if self.pulse_increasing:
-                self.pulse_opacity += 5
-                if self.pulse_opacity >= 240:
-                    self.pulse_opacity = 240
-                    self.pulse_increasing = False
-            else:
-                self.pulse_opacity -= 5
-                if self.pulse_opacity <= 180:
-                    self.pulse_opacity = 180
-                    self.pulse_increasing = True
-            
-            # Update style with new opacity
-            self.status.setStyleSheet(f"""
-                color: white; 
-                font-weight: bold;
-                font-size: 12px;
-                background-color: rgba(52, 152, 219, {self.pulse_opacity});
-                border-radius: 3px;
-                padding: 3px;
-            """)
-        
-        # Connect and start the timer
-        self.pulse_timer.timeout.connect(pulse_effect)
-        self.pulse_timer.start(50)  # 50ms for smooth animation
+        # The animation drives the opacity effect natively, so the style sheet is set only once
+        if self.pulse_animation is not None:
+            # Still pulsing from an earlier follow-up
+            self.pulse_animation.stop()
+            self.pulse_animation.deleteLater()
+        pulse_effect = QGraphicsOpacityEffect(self.status)
+        self.status.setGraphicsEffect(pulse_effect)
+        self.pulse_animation = QPropertyAnimation(pulse_effect, b"opacity", self)
+        self.pulse_animation.setDuration(1200)
+        self.pulse_animation.setKeyValueAt(0.0, 180 / 255)
+        self.pulse_animation.setKeyValueAt(0.5, 240 / 255)
+        self.pulse_animation.setKeyValueAt(1.0, 180 / 255)
+        self.pulse_animation.setEasingCurve(QEasingCurve.InOutSine)
+        self.pulse_animation.setLoopCount(-1)
+        self.pulse_animation.start()
         
         # Force UI update before starting processing
         QCoreApplication.processEvents()
         
-        # Create a very simple worker thread using a direct approach
-        class DirectWorkerThread(QThread):
-            # Define signals as class attributes for PySide6 compatibility
-            result_ready = QtSignal(str)
-            status_update = QtSignal(str)
-            
-            def __init__(self, parent, follow_up_text):
-                super().__init__(parent)
-                self.follow_up_text = follow_up_text
-                self.parent = parent
-                
-                # Connect signals to parent methods
-                self.result_ready.connect(parent.update_output)
-                self.status_update.connect(parent.update_status)
-            
-            def run(self):
-                try:
-                    # Import the API client module directly
-                    import sys
-                    import importlib
-                    import traceback
-                    from types import MethodType
-                    
-                    # Add our directory to path if needed
-                    current_dir = os.path.dirname(os.path.abspath(__file__))
-                    if current_dir not in sys.path:
-                        sys.path.append(current_dir)
-                    
-                    # Import the API client
-                    from api_client import ApiClient
-                    
-                    # Create an API client instance for the follow-up call
-                    api_client = ApiClient()
-                    
-                    # Store references to the original methods
-                    original_output_update = api_client.output_update_signal
-                    original_status_update = api_client.status_update_signal
-                    
-                    # Connect our signals to capture the API client's output
-                    # This is a workaround for signals that we can't override
-                    def connect_signals():
-                        # Define handlers to forward to our signals
-                        def output_handler(text):
-                            self.result_ready.emit(text)
-                            
-                        def status_handler(text):
-                            self.status_update.emit(text)
-                        
-                        # Connect to our handlers - save the connections to disconnect later
-                        conn1 = api_client.output_update_signal.connect(output_handler)
-                        conn2 = api_client.status_update_signal.connect(status_handler)
-                        return conn1, conn2
-                    
-                    # Connect our signal handlers
-                    connections = connect_signals()
-                    
-                    # Emit debug message to confirm signal connections are working
-                    self.result_ready.emit("# Processing Follow-up Request\n\nConnecting to API to process your request. Please wait...")
-                    
-                    # Process follow-up - output will be captured by our signal handlers
-                    self.status_update.emit("Processing follow-up request...")
-                    
-                    # Set a flag to track if we received any output
-                    received_output = False
-                    
-                    # Create a custom output handler that sets the flag
-                    def output_received(text):
-                        nonlocal received_output
-                        received_output = True
-                    
-                    # Connect our output tracking handler
-                    output_tracker_connection = api_client.output_update_signal.connect(output_received)
-                    
-                    # Process the follow-up
-                    api_client.process_follow_up(self.follow_up_text)
-                    
-                    # If we didn't receive any output, show a fallback message
-                    if not received_output:
-                        logger.warning("No output signals received from API client during follow-up")
-                        self.result_ready.emit(
-                            "# Follow-up Processing Issue\n\n"
-                            "The follow-up was processed, but no response was received from the AI.\n\n"
-                            "This can happen if:\n"
-                            "- The AI service had a temporary issue\n"
-                            "- The follow-up request was unclear\n"
-                            "- There was an internal processing error\n\n"
-                            "Please try again with a more specific follow-up request."
-                        )
-                except Exception as e:
-                    error_text = f"Error in follow-up processing: {str(e)}"
-                    error_trace = traceback.format_exc()
-                    logger.error(error_text)
-                    logger.error(error_trace)
-                    self.status_update.emit(f"Error: {str(e)}")
-                    self.result_ready.emit(f"# Error Processing Follow-up\n\nThere was an error processing your follow-up:\n\n```\n{str(e)}\n{error_trace}\n```\n\nPlease try again.")
-                finally:
-                    # Signal to stop the pulse timer
-                    # Use QTimer.singleShot which is available in both PyQt and PySide
-                    QTimer.singleShot(100, self.parent._stop_pulse_timer)
-        
-        # Create and start the thread
-        self.worker_thread = DirectWorkerThread(self, follow_up_text)
-        self.worker_thread.start()
+        # Run the request on a pooled thread instead of starting a QThread per follow-up
+        task = FollowUpTask(self._get_api_client(), follow_up_text)
+        task.signals.result_ready.connect(self.update_output)
+        task.signals.error_ready.connect(self._show_plain_output)
+        task.signals.status_update.connect(self.update_status)
+        task.signals.finished.connect(self._follow_up_finished)
+        QThreadPool.globalInstance().start(task)
+
+    def forget_follow_up_response(self):
+        """Drop the remembered follow-up response; it belongs to the analysis being replaced"""
+        self._last_follow_up = None
+
+    @staticmethod
+    def _follow_up_digest(follow_up_text):
+        """Digest identifying a follow-up by its text"""
+        return hashlib.blake2b(follow_up_text.encode(), digest_size=16).digest()
+
+    @Slot(str, bool)
+    def _follow_up_finished(self, follow_up_text, succeeded):
+        """Stop the pulse and remember the response to an answered follow-up"""
+        self._stop_pulse_timer()
+        if succeeded and self._latest_output is not None:
+            self._last_follow_up = (self._follow_up_digest(follow_up_text), time.monotonic(), self._latest_output)
+        else:
+            self._last_follow_up = None
+
+    def _get_api_client(self):
+        """Return the ApiClient used for follow-ups, creating it on first use.
+
+        It is created on the UI thread and kept for the life of the window, so its
+        output is delivered here and its signals only need connecting once.
+        """
+        if self._api_client is None:
+            # Imported here because api_client imports this module
+            from api_client import ApiClient
+            self._api_client = ApiClient()
+            self._api_client.output_update_signal.connect(self.update_output)
+            self._api_client.status_update_signal.connect(self.update_status)
+        return self._api_client
 
     def eventFilter(self, watched, event):
         """Filter events for the follow-up input to handle Enter key"""
-        if watched == self.follow_up_input and event.type() == event.Type.KeyPress:
-            key_event = event
-            
-            # Check for Enter key without Shift
-            if key_event.key() == Qt.Key_Return and not key_event.modifiers() & Qt.ShiftModifier:
-                # Submit the follow-up
-                self.submit_follow_up()
-                return True  # Event handled
-            # Check for Escape key
-            elif key_event.key() == Qt.Key_Escape:
-                # Cancel follow-up
-                self.follow_up_container.setVisible(False)
-                self.follow_up_input.clear()
-                self.status.setText("Follow-up cancelled.")
-                return True  # Event handled
-                
+        # Nearly every event is not a key press on the input; let those through first
+        if event.type() != _KEY_PRESS or watched is not self.follow_up_input:
+            return super().eventFilter(watched, event)
+
+        key = event.key()
+        # Check for Enter key without Shift
+        if key == _KEY_RETURN and not event.modifiers() & _SHIFT_MODIFIER:
+            # Submit the follow-up
+            self.submit_follow_up()
+            return True  # Event handled
+        # Check for Escape key
+        elif key == _KEY_ESCAPE:
+            # Cancel follow-up
+            self.follow_up_container.setVisible(False)
+            self.follow_up_input.clear()
+            self.status.setText("Follow-up cancelled.")
+            return True  # Event handled
+
         # Pass other events to the default handler
         return super().eventFilter(watched, event)
         
@@ -959,63 +891,125 @@ class OverlayWindow(QMainWindow):
     @Slot(str)
     def _update_output_text(self, content):
         """This method is safely called in the UI thread via signal"""
-        try:
-            # Check scroll position *before* updating content
-            scroll_bar = self.output_area.verticalScrollBar()
-            was_at_bottom = scroll_bar.value() >= (scroll_bar.maximum() - 10) # Check if near bottom (within 10px)
-
-            # Update the content
-            html_content = self.markdown_to_html(content)
-            self.output_area.setHtml(html_content)
-
-            # Auto-scroll only if user was already near the bottom
-            if was_at_bottom:
-                scroll_bar.setValue(scroll_bar.maximum()) # Scroll to the new bottom
-        except Exception as e:
-            logger.error(f"Error updating output: {e}")
-            self.output_area.setPlainText(f"Error formatting output: {e}\n\n{content}")
+        self._latest_output = content
+        # Keep only the newest content; streaming updates arriving within the
+        # interval are rendered once instead of once per chunk
+        self._pending_content = content
+        if not self._render_timer.isActive():
+            # Leading edge: nothing rendered recently, so render right away
+            self._flush_pending_render()
 
     @Slot(str)
     def _append_output_text(self, content):
         """This method is safely called in the UI thread via signal"""
-        try:
-            # Get current markdown, append new content
-            self.current_markdown += content 
+        # Get current markdown, append new content
+        self.current_markdown += content
+        # Re-render the entire content for proper markdown formatting
+        self._update_output_text(self.current_markdown)
+
+    @Slot()
+    def _flush_pending_render(self):
+        """Start rendering the most recent output content"""
+        if self._render_in_flight:
+            # _apply_rendered_html picks up the pending content when the current render is done
+            return
+        content = self._pending_content
+        self._pending_content = None
+        if content is None:
+            return
+        # Updates arriving during the interval wait for the timer
+        self._render_timer.start()
+        if not _has_markdown_syntax(content):
+            # Nothing to format: skip the markdown render and the HTML layout
+            self._show_document(content, is_html=False)
+            return
+        self._render_in_flight = True
+        task = MarkdownRenderTask(self.markdown_to_html, content, self._render_generation)
+        task.signals.finished.connect(self._apply_rendered_html)
+        self._render_pool.start(task)
+
+    @Slot(int, str)
+    def _apply_rendered_html(self, generation, html_content):
+        """Show a finished render (called on the UI thread when a MarkdownRenderTask finishes)"""
+        self._render_in_flight = False
+        # Renders started before _show_plain_output replaced the output are dropped.
+        # An unchanged document (e.g. a repeated update that hit the render cache) is not
+        # set again: setHtml would re-parse and re-layout it for nothing
+        if generation == self._render_generation and html_content != self._shown_html:
+            self._show_document(html_content)
+        if not self._render_timer.isActive():
+            # The interval has already passed; render anything that arrived meanwhile
+            self._flush_pending_render()
 
+    @Slot(str)
+    def _show_plain_output(self, text):
+        """Replace the output with plain text, skipping markdown rendering"""
+        # Pending and in-flight renders are older than this text
+        self._pending_content = None
+        self._render_generation += 1
+        self._show_document(text, is_html=False)
+
+    def _show_document(self, content, is_html=True):
+        """Replace the output document with HTML or plain text, keeping the reader's scroll position"""
+        try:
             # Check scroll position *before* updating content
             scroll_bar = self.output_area.verticalScrollBar()
-            was_at_bottom = scroll_bar.value() >= (scroll_bar.maximum() - 10) # Check if near bottom (within 10px)
-
-            # Re-render the entire content for proper markdown formatting
-            html_content = self.markdown_to_html(self.current_markdown)
-            self.output_area.setHtml(html_content)
+            scroll_pos = scroll_bar.value()
+            was_at_bottom = scroll_pos >= (scroll_bar.maximum() - 10) # Check if near bottom (within 10px)
+
+            # Replace the content and fix up the scroll position with painting paused,
+            # so the swap is drawn once instead of once per step
+            self.output_area.setUpdatesEnabled(False)
+            if is_html:
+                self.output_area.setHtml(content)
+                self._shown_html = content
+            else:
+                # Plain text uses the document's default font, not the body style of rendered output
+                font = QFont(self.output_area.font())
+                font.setFamilies(_DOCUMENT_FONT_FAMILIES)
+                font.setStyleHint(QFont.SansSerif)
+                self.output_area.document().setDefaultFont(font)
+                self.output_area.setPlainText(content)
+                self._shown_html = None
 
-            # Auto-scroll only if user was already near the bottom
             if was_at_bottom:
-                scroll_bar.setValue(scroll_bar.maximum()) # Scroll to the new bottom
+                # Auto-scroll only if user was already near the bottom. The document
+                # finishes laying out after setHtml returns, so the scroll range is only
+                # final on the next event loop pass.
+                QTimer.singleShot(0, self._scroll_output_to_bottom)
+            else:
+                # Otherwise keep their place, without querying the new scroll range
+                scroll_bar.setValue(scroll_pos)
+                self.output_area.setUpdatesEnabled(True)
         except Exception as e:
-            logger.error(f"Error appending output: {e}")
-            # Fall back to plain text append
-            self.output_area.append(content)
+            logger.error(f"Error updating output: {e}")
+            self.output_area.setPlainText(f"Error formatting output: {e}")
+            self._shown_html = None
+            self.output_area.setUpdatesEnabled(True)
+
+    @Slot()
+    def _scroll_output_to_bottom(self):
+        """Scroll the output to the end of a new render and resume painting"""
+        scroll_bar = self.output_area.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+        self.output_area.setUpdatesEnabled(True)
 
     @Slot()
     def _stop_pulse_timer(self):
         """Safely stop the pulse timer from the main thread"""
-        try:
-            if hasattr(self, 'pulse_timer') and self.pulse_timer is not None:
-                if self.pulse_timer.isActive():
-                    self.pulse_timer.stop()
-                self.pulse_timer = None
-                
-            # Reset status bar style
-            self.status.setStyleSheet("color: rgba(200, 200, 200, 200); font-style: italic; font-size: 11px;")
-        except Exception as e:
-            logger.error(f"Error stopping pulse timer: {e}")
-            # Try to reset the status bar style anyway
+        animation, self.pulse_animation = self.pulse_animation, None
+        if animation is not None:
             try:
-                self.status.setStyleSheet("color: rgba(200, 200, 200, 200); font-style: italic; font-size: 11px;")
-            except:
-                pass
+                animation.stop()
+                animation.deleteLater()
+            except Exception as e:
+                logger.error(f"Error stopping pulse timer: {e}")
+        # Removing the effect also deletes it
+        self.status.setGraphicsEffect(None)
+
+        # Reset status bar style; reapplying an unchanged stylesheet still repolishes
+        if self.status.styleSheet() != self._status_style_default:
+            self.status.setStyleSheet(self._status_style_default)
 
     @Slot()
     def bring_to_front(self):
@@ -1047,9 +1041,3 @@ class OverlayWindow(QMainWindow):
 
         except Exception as e:
              logger.error(f"Error in bring_to_front: {e}", exc_info=True)
-
-# Create the CodeBlockExtension class for compatibility
-class CodeBlockExtension(markdown.extensions.Extension):
-    def extendMarkdown(self, md):
-        # This is now a no-op since we're preprocessing the code blocks
-        pass
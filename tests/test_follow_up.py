@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+pytest.importorskip("PySide6")
+pytest.importorskip("PIL")
+
+from PIL import Image
+from PySide6.QtCore import QThreadPool
+from PySide6.QtWidgets import QApplication
+
+FOLLOW_UP = "Explain the time complexity"
+
+
+@pytest.fixture(scope="module")
+def app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def window(app, monkeypatch):
+    import overlay
+
+    started = []
+
+    class RecordingFollowUpTask(overlay.FollowUpTask):
+        def run(self):
+            started.append(self.follow_up_text)
+
+    monkeypatch.setattr(overlay, "FollowUpTask", RecordingFollowUpTask)
+    window = overlay.OverlayWindow()
+    monkeypatch.setattr(window, "_get_api_client", lambda: None)
+    window.started_follow_ups = started
+    yield window
+    window.close()
+
+
+def submit(window, text):
+    window.follow_up_input.setPlainText(text)
+    window.submit_follow_up()
+    QThreadPool.globalInstance().waitForDone()
+
+
+def answer(window, text):
+    """Record a follow-up as answered, as FollowUpTask's finished signal would"""
+    window._latest_output = "# Answer about the previous problem"
+    window._follow_up_finished(text, True)
+
+
+def test_repeated_follow_up_reuses_response(window):
+    answer(window, FOLLOW_UP)
+    submit(window, FOLLOW_UP)
+    assert window.started_follow_ups == []
+
+
+def test_new_analysis_in_between_sends_follow_up_again(window, monkeypatch):
+    import main
+
+    answer(window, FOLLOW_UP)
+    monkeypatch.setattr(main, "MOCK_MODE", True)
+    controller = main.HotkeyController(window)
+    controller._screenshots.append(Image.new("RGB", (16, 16)))
+    controller.process_screenshots()
+
+    submit(window, FOLLOW_UP)
+    assert window.started_follow_ups == [FOLLOW_UP]
+
+
+def test_reset_forgets_follow_up_response(window):
+    import main
+
+    answer(window, FOLLOW_UP)
+    main.HotkeyController(window).reset_screenshots()
+
+    submit(window, FOLLOW_UP)
+    assert window.started_follow_ups == [FOLLOW_UP]
@@ -0,0 +1,17 @@
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+
+pytest.importorskip("PySide6")
+pytest.importorskip("PIL")
+
+
+def test_root_logger_only_has_queue_handler():
+    import main
+
+    # pytest adds its own capture handlers to the root logger while a test runs
+    handlers = [handler for handler in logging.getLogger().handlers
+                if not type(handler).__module__.startswith("_pytest")]
+    assert handlers == [main.queue_handler]
+    assert isinstance(handlers[0], QueueHandler)
@@ -0,0 +1,52 @@
+import ast
+import os
+
+import pytest
+
+pytest.importorskip("markdown")
+pytest.importorskip("pygments")
+
+from markdown_renderer import create_markdown_processor, render_markdown_sections, split_markdown_sections
+
+
+def load_mock_output():
+    """MOCK_OUTPUT from main.py, read without importing main (and with it Qt)"""
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "main.py")
+    with open(path, encoding="utf-8") as f:
+        module = ast.parse(f.read())
+    for node in module.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "MOCK_OUTPUT":
+            return ast.literal_eval(node.value)
+    raise AssertionError("MOCK_OUTPUT not found in main.py")
+
+
+CASES = [
+    load_mock_output(),
+    "A\n# H\nB",
+    "\n# H\nx",
+    "- item\n# H\n1. one",
+    "> quote\n# H\n> more",
+    "text\n#hashtag\nmore",
+    "```py\n# comment\n```\n# H\nx",
+    "~~~\n# x\n~~~\n",
+    "~~~~\n# x\n~~~\n# y\n~~~~\n# H\nz",
+    "````\n```\n# x\n```\n````\n# H",
+    "Title\n=====\n# H",
+    # Reference definitions apply to the whole document
+    "Text\n[x]: http://a.com\n# H\nsee [link][x]",
+    'Para\n\n[x]: http://a.com "t"\n\n# H\n[x]',
+    # Raw HTML blocks may contain heading lines
+    "<div>\n# x\n</div>\n",
+]
+
+
+@pytest.mark.parametrize("md_text", CASES)
+def test_sectioned_conversion_matches_whole_document(md_text):
+    md = create_markdown_processor()
+    whole = md.reset().convert(md_text)
+    sectioned = render_markdown_sections(md_text, lambda section: md.reset().convert(section))
+    assert sectioned == whole
+
+
+def test_mock_output_is_split_at_headings():
+    assert len(split_markdown_sections(load_mock_output())) > 1
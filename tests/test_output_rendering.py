@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtWidgets import QApplication
+
+
+@pytest.fixture(scope="module")
+def app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.mark.parametrize("content", [
+    "- first\n- second",
+    "+ first\n+ second",
+    "1. first\n2. second",
+    "line<br>break",
+    "fish &amp; chips",
+    "first paragraph\n\nsecond paragraph",
+    "Title\n=====",
+    "    indented code",
+])
+def test_markdown_syntax_is_detected(content):
+    from overlay import _has_markdown_syntax
+
+    assert _has_markdown_syntax(content)
+
+
+@pytest.mark.parametrize("content", ["Connecting...", "line one\nline two", "version 2.0 is out."])
+def test_plain_text_is_not_markdown(content):
+    from overlay import _has_markdown_syntax
+
+    assert not _has_markdown_syntax(content)
+
+
+def test_list_only_output_goes_through_renderer(app):
+    from overlay import OverlayWindow
+
+    window = OverlayWindow()
+    try:
+        window._update_output_text("- first\n- second")
+        assert window._render_in_flight
+        window._render_pool.waitForDone()
+        app.processEvents()
+        assert "<li>first</li>" in window._shown_html
+    finally:
+        window.close()